@@ -1,8 +1,22 @@
+from operator import methodcaller
+
 __author__ = 'katja'
 
 
-class Anticipation:
+def get_best_anticipation(anticipations):
+    """
+    Argmax of compare(), found in one pass rather than by sorting the anticipations.
+    :param anticipations: (list) of Anticipations, not empty
+    :return: (Anticipation) the first of those that compare highest; a stable sort by decreasing compare() would put
+    the same one first, so ties are still broken by the order in which anticipations were proposed
+    """
+    return max(anticipations, key=methodcaller('compare'))
+
+
+class Anticipation(object):
     """Anticipation is created from each proposed primitive interaction."""
+    __slots__ = ('interaction', 'proclivity')
+
     def __init__(self, interaction, proclivity):
         self.interaction = interaction
         self.proclivity = proclivity
@@ -26,6 +40,7 @@ class Anticipation:
 
 class RecursiveAnticipation(Anticipation):
     """An recursive anticipation is created for each proposed experiment."""
+    __slots__ = ('experiment',)
 
     def __init__(self, experiment, proclivity):
         Anticipation.__init__(self, None, proclivity)
@@ -48,8 +63,16 @@ class RecursiveAnticipation(Anticipation):
         """Anticipations are equal to each other if they propose the same experiment"""
         return self.get_experiment() == other.get_experiment()
 
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.get_experiment())
+
 
 class ConstructiveAnticipation(Anticipation):
+    __slots__ = ()
+
     def __init__(self, interaction, proclivity):
         Anticipation.__init__(self, interaction, proclivity)
 
@@ -60,3 +83,9 @@ class ConstructiveAnticipation(Anticipation):
     def __eq__(self, other):
         """Anticipations are equal to each other if they propose the same experiment"""
         return self.get_interaction() == other.get_interaction()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.get_interaction())
@@ -1,7 +1,9 @@
 from interaction import Interaction
 from experiment import Experiment, RecursiveExperiment
-from result import Result
-from anticipation import Anticipation, RecursiveAnticipation, ConstructiveAnticipation
+from result import Result, FailedResult
+from memory import InteractionMemory
+from anticipation import Anticipation, RecursiveAnticipation, ConstructiveAnticipation, get_best_anticipation
+from tracer import Tracer, DEBUG
 import random
 
 __author__ = 'katja'
@@ -15,23 +17,26 @@ class Existence:
     interactions are interactions which consist of primitive interactions.
     When a given experiment is performed and a given result is obtained, the corresponding Interaction is considered
     enacted.
+    Each existence has its own memory of experiments, results and interactions.
     """
 
-    EXPERIMENTS = dict()
-    INTERACTIONS = dict()
-    RESULTS = dict()
-
-    def __init__(self, primitive_interactions, environment):
+    def __init__(self, primitive_interactions, environment, tracer=None, memory=None):
         """
         Initialize existence with a set of primitive interactions and environment.
         :param primitive_interactions: (dict) of primitive interactions of the form
         {(str) interaction meaning: ((str) experiment, (str) result, (int) valence)}
         :param environment: (Environment) that controls which results are returned for a given primitive experiment
+        :param tracer: (Tracer) trace of the agent's activity; tracing is off if None
+        :param memory: (InteractionMemory) empty memory to learn in, e.g. with a budget; an unbounded one if None
         :return: (Existence)
         """
         self.context_interaction = None
         self.mood = None
         self.environment = environment
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.experiments = dict()
+        self.results = dict()
+        self.memory = memory if memory is not None else InteractionMemory()
         self.initialize_interactions(primitive_interactions)
 
     def step(self):
@@ -39,13 +44,13 @@ class Existence:
         Execute a single simulation step.
         :return: (str) performed interaction and mood
         """
-        print "Context: ", self.context_interaction
+        self.tracer.debug("Context: %s", self.context_interaction)
         anticipations = self.anticipate()  # anticipate possible interactions
         experiment = self.select_experiment(anticipations)  # select the best experiment
         result_label = self.environment.return_result(experiment)  # consult the world and return result
         result = self.addget_result(result_label)  # add result to the dictionary
-        enacted_interaction = self.get_interaction(experiment.get_label() + result.get_label())
-        print "Enacted ", enacted_interaction
+        enacted_interaction = self.addget_primitive_interaction(experiment, result)
+        self.tracer.info("Enacted %s", enacted_interaction)
 
         if enacted_interaction.get_valence() > 0:
             self.mood = 'HAPPY'
@@ -54,6 +59,7 @@ class Existence:
 
         self.learn_composite_interaction(self.context_interaction, enacted_interaction)
         self.context_interaction = enacted_interaction
+        self.prune_memory()
 
         return experiment.get_label() + result.get_label() + " " + self.mood
 
@@ -74,22 +80,21 @@ class Existence:
 
     def addget_primitive_interaction(self, experiment, result, valence=None, meaning=None):
         """
-        If a primitive interaction is not in the INTERACTIONS dictionary, add it. Otherwise just return it.
-        :param experiment: (str) primitive experiment
-        :param result: (str) primitive result
+        If a primitive interaction is not in memory, add it. Otherwise just return it.
+        :param experiment: (Experiment) primitive experiment
+        :param result: (Result) primitive result
         :param valence: (int) valence of the interaction
         :param meaning: (str) observer's meaning of the interaction
-        :return: (interaction) primitive interaction from the INTERACTIONS dictionary
+        :return: (interaction) primitive interaction from memory
         """
-        label = experiment.get_label() + result.get_label()
-        if label not in self.INTERACTIONS:
-            interaction = Interaction(label)
+        interaction = self.memory.get_primitive((experiment, result))
+        if interaction is None:
+            interaction = self.memory.add_primitive((experiment, result))
             interaction.set_experiment(experiment)
             interaction.set_result(result)
             interaction.set_valence(valence)
             interaction.set_meaning(meaning)
-            self.INTERACTIONS[label] = interaction
-        return self.INTERACTIONS[label]
+        return interaction
 
     def learn_composite_interaction(self, context_interaction, enacted_interaction):
         """
@@ -98,20 +103,30 @@ class Existence:
         :param enacted_interaction: (Interaction) just performed
         """
         if context_interaction is not None:
-            label = context_interaction.get_label() + enacted_interaction.get_label()
-            if label not in self.INTERACTIONS:
-                # valence is a sum of primitive interactions
-                valence = context_interaction.get_valence() + enacted_interaction.get_valence()
-                interaction = Interaction(label)
-                interaction.set_pre_interaction(context_interaction)
-                interaction.set_post_interaction(enacted_interaction)
-                interaction.set_valence(valence)
-                self.INTERACTIONS[label] = interaction
-                print "Learn " + label
+            interaction = self.memory.get_composite(context_interaction, enacted_interaction)
+            if interaction is None:
+                interaction = self.memory.add_composite(context_interaction, enacted_interaction)
+                self.initialize_composite_interaction(interaction)
+                self.tracer.info("Learn %s", interaction)
             else:
-                interaction = self.INTERACTIONS[label]
-                print 'Incrementing weight for ', interaction
-                interaction.increment_weight()
+                self.tracer.debug("Incrementing weight for %s", interaction)
+                self.memory.reinforce(interaction)
+
+    def prune_memory(self):
+        """Keep the memory within its budget, without forgetting the context of the existence."""
+        evicted = self.memory.prune([self.context_interaction])
+        if evicted:
+            self.tracer.debug("Forgot %d interactions", len(evicted))
+        return evicted
+
+    def initialize_composite_interaction(self, interaction):
+        """
+        Set up a composite interaction just added to memory.
+        :param interaction: (Interaction) composite interaction with its pre- and post-interaction set
+        """
+        # valence is a sum of primitive interactions
+        valence = interaction.get_pre_interaction().get_valence() + interaction.get_post_interaction().get_valence()
+        interaction.set_valence(valence)
 
     def anticipate(self):
         """
@@ -127,7 +142,7 @@ class Existence:
                 # proclivity is a product of the weight of the whole interaction and a valence of proposed
                 proclivity = activated_interaction.get_weight() * proposed_interaction.get_valence()
                 anticipations.append(Anticipation(proposed_interaction, proclivity))
-                print "Afforded: ", proposed_interaction, " proclivity: " + str(proclivity)
+                self.tracer.debug("Afforded: %s proclivity: %s", proposed_interaction, proclivity)
         return anticipations
 
     def get_activated_interactions(self):
@@ -135,99 +150,96 @@ class Existence:
         Retrieve activated interactions based on current context.
         :return: (list) of Interactions
         """
-        activated_interactions = []
-        # loop through all known interactions
-        for key in self.INTERACTIONS:
-            activated_interaction = self.INTERACTIONS[key]
-            # see if known interaction's pre-interactions is the same as interaction performed at t-1
-            if activated_interaction.get_pre_interaction() == self.context_interaction:
-                activated_interactions.append(activated_interaction)
-        return activated_interactions
+        # known interactions whose pre-interaction is the same as interaction performed at t-1
+        return list(self.memory.get_activated_interactions(self.context_interaction))
 
     def select_experiment(self, anticipations):
         """Select experiment from proposed anticipations"""
         if len(anticipations) > 0:
-            #anticipations.sort(key=lambda x: x.compare(), reverse=True)  # choose by proclivity
-            anticipations.sort(key=lambda x: x.compare(), reverse=True)  # choose by valence
-            afforded_interaction = anticipations[0].get_interaction()
+            afforded_interaction = get_best_anticipation(anticipations).get_interaction()  # choose by valence
             if afforded_interaction.get_valence() >= 0:
                 intended_interaction = afforded_interaction
-                print "Intending ", intended_interaction
+                self.tracer.info("Intending %s", intended_interaction)
                 chosen_experiment = intended_interaction.get_experiment()
             else:
                 # if proposed interaction leads to negative valence, choose at random
                 chosen_experiment = self.get_random_experiment(afforded_interaction)
-                print "Don't like the affordance, intending experiment " + chosen_experiment.get_label()
+                self.tracer.info("Don't like the affordance, intending experiment %s", chosen_experiment)
         else:
             # if nothing was anticipated, choose at random
             chosen_experiment = self.get_random_experiment(None)
-            print "Don't know what to do, intending experiment " + chosen_experiment.get_label()
+            self.tracer.info("Don't know what to do, intending experiment %s", chosen_experiment)
         return chosen_experiment
 
     def get_random_experiment(self, interaction):
-        random_experiment = random.choice(self.EXPERIMENTS.values())
+        random_experiment = random.choice(self.experiments.values())
         if interaction is None:
             return random_experiment
         else:
             # trying to choose a random experiment but avoid choosing one that was part of the rejected interaction
             bad_experiment = interaction.get_experiment()
-            chosen_experiment = random.choice(self.EXPERIMENTS.values())
+            chosen_experiment = random.choice(self.experiments.values())
             while chosen_experiment == bad_experiment:
-                chosen_experiment = random.choice(self.EXPERIMENTS.values())
+                chosen_experiment = random.choice(self.experiments.values())
             return random_experiment
 
     def addget_result(self, label):
-        if label not in self.RESULTS:
-            self.RESULTS[label] = Result(label)
-        return self.RESULTS[label]
+        if label not in self.results:
+            self.results[label] = Result(label)
+        return self.results[label]
 
     def addget_experiment(self, label):
-        if label not in self.EXPERIMENTS:
-            self.EXPERIMENTS[label] = Experiment(label)
-        return self.EXPERIMENTS[label]
+        if label not in self.experiments:
+            self.experiments[label] = Experiment(label)
+        return self.experiments[label]
 
     def addget_interaction(self, label):
-        if label not in self.INTERACTIONS:
-            self.INTERACTIONS[label] = Interaction(label)
-        return self.INTERACTIONS[label]
+        """Get a primitive interaction by its label, adding it to memory if it is not known."""
+        interaction = self.memory.get_primitive(label)
+        if interaction is None:
+            interaction = self.memory.add_primitive(label, label)
+        return interaction
 
     def get_interaction(self, label):
-        if label in self.INTERACTIONS:
-            return self.INTERACTIONS[label]
-        else:
-            return None
+        return self.memory.get_primitive(label)
 
 
 class RecursiveExistence(Existence):
     """Implements recursive self-programming.
     Context is now of depth 2: prev_context_interaction at t-2, and context_interaction at t-1"""
 
-    def __init__(self, primitive_interactions, environment):
+    def __init__(self, primitive_interactions, environment, tracer=None, memory=None):
         """Initialize existence with a set of primitive interactions provided as a dictionary:
         {(str) interaction meaning: ((str) experiment, (str) result, (int) valence)"""
-        Existence.__init__(self, primitive_interactions, environment)
+        Existence.__init__(self, primitive_interactions, environment, tracer, memory)
         self.context_pair_interaction = None  # context at previous two steps (t-2, t-1)
+        self.failed_results = dict()  # enacted interaction ID -> result of abstract experiments that enacted it
+        self.primitive_experiments = None  # experiments proposed by default, listed when first needed
 
     def step(self):
-        print "Memory: ", self.INTERACTIONS.keys()
+        tracer = self.tracer
+        if tracer.is_enabled(DEBUG):
+            tracer.debug("Memory: %s", [interaction.get_label() for interaction in self.memory])
         anticipations = self.anticipate()
-        for anticipation in anticipations:
-            print "Anticipated: ", anticipation
+        if tracer.is_enabled(DEBUG):
+            for anticipation in anticipations:
+                tracer.debug("Anticipated: %s", anticipation)
         experiment = self.select_experiment(anticipations)  # recursive experiment
-        print "Selected experiment: " + experiment.get_label()
+        tracer.info("Selected experiment: %s", experiment)
         intended_interaction = experiment.get_intended_interaction()
-        print "Intending: ", intended_interaction
-        print "Intending experiment: ", intended_interaction.get_experiment().get_label()
+        tracer.info("Intending: %s", intended_interaction)
+        tracer.debug("Intending experiment: %s", intended_interaction.get_experiment())
         enacted_interaction = self.enact(intended_interaction)
 
-        print "Enacted ", enacted_interaction
-        if enacted_interaction != intended_interaction and experiment.is_abstract:
-            failed_result = self.addget_result(enacted_interaction.get_label().upper())
-            print "failed result: ", failed_result.get_label()
+        tracer.info("Enacted %s", enacted_interaction)
+        if enacted_interaction != intended_interaction and experiment.is_abstract():
+            failed_result = self.addget_failed_result(enacted_interaction)
+            if tracer.is_enabled(DEBUG):
+                tracer.debug("failed result: %s", failed_result.get_label())
             valence = enacted_interaction.get_valence()
-            print "experiment: ", str(experiment)
+            tracer.debug("experiment: %s", experiment)
             enacted_interaction = self.addget_primitive_interaction(experiment, failed_result, valence)
-            print "Really enacted ", enacted_interaction
+            tracer.info("Really enacted %s", enacted_interaction)
 
         if enacted_interaction.get_valence() >= 0:
             self.mood = 'HAPPY'
@@ -236,6 +248,7 @@ class RecursiveExistence(Existence):
 
         # learn context_pair_interaction, context_interaction, enacted_interaction
         self.learn_recursive_interaction(enacted_interaction)
+        self.prune_memory()
         return enacted_interaction.__repr__() + " " + self.mood
 
     def initialize_interactions(self, primitive_interactions):
@@ -248,79 +261,137 @@ class RecursiveExistence(Existence):
             result = self.addget_result(result_label)
             self.addget_primitive_interaction(experiment, result, valence, meaning)
 
-        for experiment in self.EXPERIMENTS.values():
+        for experiment in self.experiments.values():
             interaction = Interaction(experiment.get_label() + "r2")
             interaction.set_valence(1)
             interaction.set_experiment(experiment)
             experiment.set_intended_interaction(interaction)
 
     def addget_abstract_experiment(self, label):
-        if label not in self.EXPERIMENTS:
+        if label not in self.experiments:
             experiment = RecursiveExperiment(label)
-            self.EXPERIMENTS[label] = experiment
-        return self.EXPERIMENTS[label]
+            self.experiments[label] = experiment
+            self.primitive_experiments = None
+        return self.experiments[label]
+
+    def prune_memory(self):
+        evicted = self.memory.prune([self.context_interaction, self.context_pair_interaction])
+        if evicted:
+            self.tracer.debug("Forgot %d interactions", len(evicted))
+            # the IDs of forgotten interactions are given to new ones
+            for interaction in evicted:
+                self.failed_results.pop(interaction.get_id(), None)
+        return evicted
+
+    def addget_failed_result(self, enacted_interaction):
+        """Get the result that stands for enacting enacted_interaction instead of an intended interaction."""
+        if enacted_interaction.get_id() not in self.failed_results:
+            self.failed_results[enacted_interaction.get_id()] = FailedResult(enacted_interaction)
+        return self.failed_results[enacted_interaction.get_id()]
 
     def enact(self, intended_interaction):
+        """
+        Enact the primitive interactions of intended_interaction in order, without recursion, and stop at the first
+        one that is not enacted as intended. If none fails, intended_interaction was enacted. Otherwise, going up from
+        the failed primitive interaction, every composite whose post-interaction contains it is rebuilt from its
+        pre-interaction, which was enacted, and what was enacted instead of its post-interaction.
+        Only the nesting of pre- and post-interactions is walked without recursion: a primitive interaction recorded
+        for an abstract experiment still enacts the experiment's intended interaction through enact.
+        """
         if intended_interaction.is_primitive():
             return self.enact_primitive_interaction(intended_interaction)
-            # experiment = intended_interaction.get_experiment()
-            # result = self.return_result(experiment)
-            # return experiment, result
-        else:
-            # enact pre-interaction
-            enacted_pre_interaction = self.enact(intended_interaction.get_pre_interaction())
-            if enacted_pre_interaction != intended_interaction.get_pre_interaction():
-                return enacted_pre_interaction
+        for index, primitive_interaction in enumerate(intended_interaction.get_sequence()):
+            enacted_interaction = self.enact_primitive_interaction(primitive_interaction)
+            if enacted_interaction is not primitive_interaction:
+                for composite_interaction in self.get_enclosing_posts(intended_interaction, index):
+                    enacted_interaction = self.addget_composite_interaction(composite_interaction.get_pre_interaction(),
+                                                                            enacted_interaction)
+                return enacted_interaction
+        return intended_interaction
+
+    def get_enclosing_posts(self, composite_interaction, index):
+        """
+        :param index: (int) position of a primitive interaction in the sequence of composite_interaction
+        :return: (list) of the composites, among composite_interaction and its parts, whose post-interaction contains
+        that primitive interaction, deepest first
+        """
+        composites = []
+        interaction = composite_interaction
+        # go down from the top, where the lengths of the parts tell which one the primitive interaction is in
+        while not interaction.is_primitive():
+            pre_length = interaction.get_pre_interaction().get_length()
+            if index < pre_length:
+                interaction = interaction.get_pre_interaction()
             else:
-                # enact post-interaction
-                enacted_post_interaction = self.enact(intended_interaction.get_post_interaction())
-                return self.addget_composite_interaction(enacted_pre_interaction, enacted_post_interaction)
+                composites.append(interaction)
+                index -= pre_length
+                interaction = interaction.get_post_interaction()
+        composites.reverse()
+        return composites
 
     def enact_primitive_interaction(self, intended_interaction):
         """Implements the cognitive coupling between the agent and the environment.
         Tries to enact primitive intended_interaction."""
         experiment = intended_interaction.get_experiment()
+        if experiment.is_abstract():
+            # the interaction records that trying an abstract experiment enacted something else: try it again
+            enacted_interaction = self.enact(experiment.get_intended_interaction())
+            if enacted_interaction != experiment.get_intended_interaction():
+                failed_result = self.addget_failed_result(enacted_interaction)
+                valence = enacted_interaction.get_valence()
+                enacted_interaction = self.addget_primitive_interaction(experiment, failed_result, valence)
+            return enacted_interaction
         result_label = self.environment.return_result(experiment)
         result = self.addget_result(result_label)
         return self.addget_primitive_interaction(experiment, result)
 
     def select_experiment(self, anticipations):
-        anticipations.sort(key=lambda x: x.compare(), reverse=True)  # choose by valence
-        selected_anticipation = anticipations[0]
+        selected_anticipation = get_best_anticipation(anticipations)  # choose by proclivity
         return selected_anticipation.get_experiment()
 
     def anticipate(self):
         anticipations = self.get_default_anticipations()
         # print "Default anticipations: ", anticipations
         if self.context_interaction is not None:
-            activated_interactions = self.get_activated_interactions()
-            for activated_interaction in activated_interactions:
-                # print "activated interaction: ", activated_interaction
-                experiment = activated_interaction.get_post_interaction().get_experiment()
-                # print "activated experiment: " + experiment.get_label()
-                proclivity = activated_interaction.get_weight() * activated_interaction.get_post_interaction().get_valence()
-                # print "activated proclivity: " + str(proclivity)
-                anticipation = RecursiveAnticipation(experiment, proclivity)
+            proposed = dict((anticipation, anticipation) for anticipation in anticipations)
+            context_interactions = self.get_context_interactions()
+            self.trace_activated_interactions(context_interactions)
+            # activated interactions propose the experiment of their post-interaction
+            proposals = self.memory.sum_activations(context_interactions, Interaction.get_experiment)
+            for post_interaction, weight, proclivity in proposals:
+                anticipation = RecursiveAnticipation(post_interaction.get_experiment(), proclivity)
                 # print "activated anticipation: ", anticipation
-                if anticipation not in anticipations:
-                    anticipations.append(anticipation)
-                else:
-                    index = anticipations.index(anticipation)
-                    anticipations[index].add_proclivity(proclivity)
+                self.merge_anticipation(anticipations, proposed, anticipation)
                 # print "Afforded ", anticipation
         return anticipations
 
+    def merge_anticipation(self, anticipations, proposed, anticipation):
+        """
+        Add an anticipation to the list, or add its proclivity to the equal anticipation already proposed.
+        :param anticipations: (list) of Anticipations in the order they were proposed
+        :param proposed: (dict) mapping each Anticipation in the list to itself, used for hashed lookup
+        :param anticipation: (Anticipation) newly proposed anticipation
+        """
+        if anticipation not in proposed:
+            proposed[anticipation] = anticipation
+            anticipations.append(anticipation)
+        else:
+            proposed[anticipation].add_proclivity(anticipation.get_proclivity())
+
     def get_default_anticipations(self):
         """All known experiments are proposed by default with proclivity 0"""
-        anticipations = []
-        for experiment in self.EXPERIMENTS.values():
-            if not experiment.is_abstract:
-                anticipation = RecursiveAnticipation(experiment, 0)
-                anticipations.append(anticipation)
+        if self.primitive_experiments is None:
+            self.primitive_experiments = [experiment for experiment in self.experiments.values()
+                                          if not experiment.is_abstract()]
+        anticipations = [RecursiveAnticipation(experiment, 0) for experiment in self.primitive_experiments]
         random.shuffle(anticipations) # shuffle order
         return anticipations
 
-    def get_activated_interactions(self):
+    def get_context_interactions(self):
+        """
+        :return: (list) of Interactions that activate composites: the interaction enacted at t-1, its post-interaction
+        if it is composite, and the pair of interactions enacted at t-2 and t-1
+        """
         context_interactions = []
         if self.context_interaction is not None:
             context_interactions.append(self.context_interaction)
@@ -328,17 +399,23 @@ class RecursiveExistence(Existence):
                 context_interactions.append(self.context_interaction.get_post_interaction())
             if self.context_pair_interaction is not None:
                 context_interactions.append(self.context_pair_interaction)
-        print "Context: ", context_interactions
+        return context_interactions
+
+    def get_activated_interactions(self):
+        context_interactions = self.get_context_interactions()
         activated_interactions = []
-        for key in self.INTERACTIONS:
-            activated_interaction = self.INTERACTIONS[key]
-            if not activated_interaction.is_primitive():
-                if activated_interaction.get_pre_interaction() in context_interactions:
-                    activated_interactions.append(activated_interaction)
-        for activated_interaction in activated_interactions:
-            print "Activated: ", activated_interaction
+        for context_interaction in context_interactions:
+            activated_interactions.extend(self.memory.get_activated_interactions(context_interaction))
+        self.trace_activated_interactions(context_interactions)
         return activated_interactions
 
+    def trace_activated_interactions(self, context_interactions):
+        self.tracer.debug("Context: %s", context_interactions)
+        if self.tracer.is_enabled(DEBUG):
+            for context_interaction in context_interactions:
+                for activated_interaction in self.memory.get_activated_interactions(context_interaction):
+                    self.tracer.debug("Activated: %s", activated_interaction)
+
     def get_context_interaction(self):
         return self.context_interaction
 
@@ -370,12 +447,12 @@ class RecursiveExistence(Existence):
 
     def addreinforce_composite_interaction(self, pre_interaction, post_interaction):
         composite_interaction = self.addget_composite_interaction(pre_interaction, post_interaction)
-        composite_interaction.increment_weight()
+        self.memory.reinforce(composite_interaction)
 
         if composite_interaction.get_weight() == 1:
-            print "Learned: ", composite_interaction
+            self.tracer.info("Learned: %s", composite_interaction)
         else:
-            print "Reinforced: ", composite_interaction
+            self.tracer.debug("Reinforced: %s", composite_interaction)
 
         return composite_interaction
 
@@ -383,44 +460,46 @@ class RecursiveExistence(Existence):
         """Record in or get from a composite interaction in memory.
         If a new composite interaction is created, then a new abstract experience is also created and associated to it.
         """
-        label = "<" + pre_interaction.get_label() + post_interaction.get_label() + ">"
-        interaction = self.get_interaction(label)
+        interaction = self.memory.get_composite(pre_interaction, post_interaction)
         if interaction is None:
-            interaction = self.addget_interaction(label)
-            interaction.set_pre_interaction(pre_interaction)
-            interaction.set_post_interaction(post_interaction)
-            valence = pre_interaction.get_valence() + post_interaction.get_valence()
-            interaction.set_valence(valence)
-            experiment_label = interaction.get_label().upper()
-            new_experiment = self.addget_abstract_experiment(experiment_label)
-            new_experiment.set_abstract()
-            new_experiment.set_intended_interaction(interaction)
-            interaction.set_experiment(new_experiment)
+            interaction = self.memory.add_composite(pre_interaction, post_interaction)
+            self.initialize_composite_interaction(interaction)
         return interaction
 
+    def initialize_composite_interaction(self, interaction):
+        Existence.initialize_composite_interaction(self, interaction)
+        new_experiment = RecursiveExperiment()
+        new_experiment.set_abstract()
+        new_experiment.set_intended_interaction(interaction)
+        interaction.set_experiment(new_experiment)
+
 
 class ConstructiveExistence(RecursiveExistence):
     """
     In constructive existence the basic unit of analysis and implementation is interaction, not experiments and results.
     """
-    def __init__(self, primitive_interactions, environment):
-        RecursiveExistence.__init__(self, primitive_interactions, environment)
+    def __init__(self, primitive_interactions, environment, tracer=None, memory=None):
+        RecursiveExistence.__init__(self, primitive_interactions, environment, tracer, memory)
+        self.primitive_interactions = None  # primitive interactions of the memory the defaults were sorted from
+        self.default_interactions = None  # interactions proposed by default, by decreasing valence
 
     # Existence 50.2
     def step(self):
-        # print "Memory: ", self.INTERACTIONS.keys()
+        # print "Memory: ", [interaction.get_label() for interaction in self.memory]
+        tracer = self.tracer
         anticipations = self.anticipate()
-        for anticipation in anticipations:
-            print "Anticipated: ", anticipation
+        if tracer.is_enabled(DEBUG):
+            for anticipation in anticipations:
+                tracer.debug("Anticipated: %s", anticipation)
         intended_interaction = self.select_interaction(anticipations)
-        print "Intended interaction: ", intended_interaction
+        tracer.info("Intended interaction: %s", intended_interaction)
         enacted_interaction = self.enact(intended_interaction)
-        print "Enacted interaction: ", enacted_interaction
+        tracer.info("Enacted interaction: %s", enacted_interaction)
 
         # if intended interaction failed, record the alternative
         if enacted_interaction != intended_interaction:
             intended_interaction.add_alternative_interaction(enacted_interaction)
-            print "Alternative interactions:", intended_interaction.get_alternative_interactions()
+            tracer.debug("Alternative interactions: %s", intended_interaction.get_alternative_interactions())
 
         if enacted_interaction.get_valence() >= 0:
             self.mood = 'HAPPY'
@@ -428,6 +507,7 @@ class ConstructiveExistence(RecursiveExistence):
             self.mood = 'SAD'
 
         self.learn_recursive_interaction(enacted_interaction)
+        self.prune_memory()
 
         return enacted_interaction.__repr__() + " " + self.mood
 
@@ -448,96 +528,60 @@ class ConstructiveExistence(RecursiveExistence):
         """
         All experiments are now abstract, namely they are interactions.
         """
-        label = interaction.get_label().upper()
-        if label not in self.EXPERIMENTS:
-            abstract_experiment = RecursiveExperiment(label)
+        if interaction.get_experiment() is None:
+            abstract_experiment = RecursiveExperiment()
             abstract_experiment.set_intended_interaction(interaction)
             abstract_experiment.set_abstract()
             interaction.set_experiment(abstract_experiment)
-            self.EXPERIMENTS[label] = abstract_experiment
-        return self.EXPERIMENTS[label]
+        return interaction.get_experiment()
 
-    def addget_composite_interaction(self, pre_interaction, post_interaction):
-        """Record in or get from a composite interaction in memory.
-        If a new composite interaction is created, then a new abstract experience is also created and associated to it.
-        """
-        label = "<" + pre_interaction.get_label() + post_interaction.get_label() + ">"
-        interaction = self.get_interaction(label)
-        if interaction is None:
-            interaction = self.addget_interaction(label)
-            interaction.set_pre_interaction(pre_interaction)
-            interaction.set_post_interaction(post_interaction)
-            valence = pre_interaction.get_valence() + post_interaction.get_valence()
-            interaction.set_valence(valence)
-            self.addget_abstract_experiment(interaction)
-        return interaction
+    def initialize_composite_interaction(self, interaction):
+        Existence.initialize_composite_interaction(self, interaction)
+        self.addget_abstract_experiment(interaction)
 
     # Existence 50.2
     def anticipate(self):
         anticipations = self.get_default_anticipations()
-        print "Default anticipations: ", anticipations
-        activated_interactions = self.get_activated_interactions()
-        # print "Activated interactions: ", activated_interactions
+        self.tracer.debug("Default anticipations: %s", anticipations)
+        context_interactions = self.get_context_interactions()
+        self.trace_activated_interactions(context_interactions)
         if self.context_interaction is not None:
-            for activated_interaction in activated_interactions:
-                proposed_interaction = activated_interaction.get_post_interaction()
-                # print "activated experiment: " + experiment.get_label()
-                proclivity = activated_interaction.get_weight() * proposed_interaction.get_valence()
+            proposed = dict((anticipation, anticipation) for anticipation in anticipations)
+            # total weight with which each post-interaction is activated in the current context
+            activation_weights = dict()
+            for proposed_interaction, weight, proclivity in self.memory.sum_activations(context_interactions):
                 anticipation = ConstructiveAnticipation(proposed_interaction, proclivity)
                 # print "activated anticipation: " + anticipation.__repr__()
-                if anticipation not in anticipations:
-                    anticipations.append(anticipation)
-                else:
-                    index = anticipations.index(anticipation)
-                    # increment proclivity if anticipation is already in the list
-                    anticipations[index].add_proclivity(proclivity)
-                # print "Afforded " + anticipation.__repr__()
+                # increment proclivity if anticipation is already in the list
+                self.merge_anticipation(anticipations, proposed, anticipation)
+                activation_weights[proposed_interaction] = weight
 
             for anticipation in anticipations:
-                index = anticipations.index(anticipation)
                 alternative_interactions = anticipation.get_interaction().get_alternative_interactions()
                 for interaction in alternative_interactions:
-                    for activated_interaction in activated_interactions:
-                        # combine proclivity with alternative interactions
-                        if interaction == activated_interaction.get_post_interaction():
-                            proclivity = activated_interaction.get_weight() * interaction.get_valence()
-                            anticipations[index].add_proclivity(proclivity)
+                    # combine proclivity with alternative interactions
+                    if interaction in activation_weights:
+                        proclivity = activation_weights[interaction] * interaction.get_valence()
+                        anticipation.add_proclivity(proclivity)
         return anticipations
 
     # Existence 50.2
     def get_default_anticipations(self):
-        anticipations = []
-        for interaction in self.INTERACTIONS.values():
-            if interaction.is_primitive():
-                # print "interaction is primitive"
-                anticipation = ConstructiveAnticipation(interaction, 0)
-                # print "adding anticipation", anticipation
-                anticipations.append(anticipation)
-        # sort default anticipations by valence - this could be random...
-        anticipations.sort(key=lambda x: x.get_interaction().get_valence(), reverse=True)
-        #anticipations.sort(key=lambda x: x.get_interaction().get_label())
-        return anticipations
+        primitive_interactions = self.memory.get_primitive_interactions()
+        # the memory gives a new list when primitive interactions are added
+        if primitive_interactions is not self.primitive_interactions:
+            self.primitive_interactions = primitive_interactions
+            # sort default anticipations by valence - this could be random...
+            self.default_interactions = sorted(primitive_interactions, key=lambda x: x.get_valence(), reverse=True)
+        return [ConstructiveAnticipation(interaction, 0) for interaction in self.default_interactions]
 
-    def enact(self, intended_interaction):
-        # if interaction is primivite, consult the world and get what was actually enacted
-        if intended_interaction.is_primitive():
-            enacted_interaction_label = self.environment.enact_primitive_interaction(intended_interaction)
-            enacted_interaction = self.addget_interaction(enacted_interaction_label)
-            return enacted_interaction
-        else:
-            # if interaction is composite, try to enact its pre-interaction
-            enacted_pre_interaction = self.enact(intended_interaction.get_pre_interaction())
-            # if enacting failed, break the sequence and return
-            if enacted_pre_interaction != intended_interaction.get_pre_interaction():
-                return enacted_pre_interaction
-            else:
-                # if enacting pre-interaction succeeded, try to enact post-interaction
-                enacted_post_interaction = self.enact(intended_interaction.get_post_interaction())
-                return self.addget_composite_interaction(enacted_pre_interaction, enacted_post_interaction)
+    def enact_primitive_interaction(self, intended_interaction):
+        # consult the world and get what was actually enacted
+        enacted_interaction_label = self.environment.enact_primitive_interaction(intended_interaction)
+        return self.addget_interaction(enacted_interaction_label)
 
     def select_interaction(self, anticipations):
-        anticipations.sort(key=lambda x: x.compare(), reverse=True)  # choose by proclivity
-        selected_anticipation = anticipations[0]
+        selected_anticipation = get_best_anticipation(anticipations)  # choose by proclivity
         intended_interaction = selected_anticipation.get_interaction()
         # if intended_interaction.get_valence() < 0:
         #     intended_interaction = self.get_random_interaction(intended_interaction)
@@ -545,14 +589,15 @@ class ConstructiveExistence(RecursiveExistence):
         return intended_interaction
 
     def get_random_interaction(self, interaction):
-        random_interaction = random.choice(self.INTERACTIONS.values())
+        # iterate the memory rather than index it, since pruning leaves the IDs of forgotten interactions empty
+        interactions = list(self.memory)
+        random_interaction = random.choice(interactions)
         if interaction is None:
             return random_interaction
         else:
             bad_experiment = interaction.get_experiment()
-            chosen_experiment = random_interaction.get_experiment()
-            while chosen_experiment == bad_experiment:
-                random_interaction = random.choice(self.INTERACTIONS.values())
+            while random_interaction.get_experiment() == bad_experiment:
+                random_interaction = random.choice(interactions)
             return random_interaction
 
     # # Existence 50 and 50.1
@@ -1,8 +1,10 @@
 __author__ = 'katja'
 
 
-class Experiment:
+class Experiment(object):
     """ A primitive experiment that can be chosen by the agent """
+    __slots__ = ('label',)
+
     def __init__(self, label):
         self.label = label
 
@@ -21,18 +23,26 @@ class RecursiveExperiment(Experiment):
     An experiment that can be primitive or abstract.
     An abstract experiment has an intended_interaction, which is a sensorimotor pattern an agent can try to enact.
     It also has a list of enacted_interactions, which are interactions that might be enacted instead of intended ones.
+    An experiment created without a label is labelled after its intended interaction.
     """
-    def __init__(self, label):
+    __slots__ = ('abstract', 'intended_interaction', 'enacted_interactions')
+
+    def __init__(self, label=None):
         Experiment.__init__(self, label)
-        self.is_abstract = False
+        self.abstract = False
         self.intended_interaction = None
-        self.enacted_interactions = []
+        self.enacted_interactions = None
+
+    def get_label(self):
+        if self.label is None:
+            return self.intended_interaction.get_label().upper()
+        return self.label
 
     def is_abstract(self):
-        return self.is_abstract
+        return self.abstract
 
     def set_abstract(self):
-        self.is_abstract = True
+        self.abstract = True
 
     def set_intended_interaction(self, intended_interaction):
         self.intended_interaction = intended_interaction
@@ -41,8 +51,12 @@ class RecursiveExperiment(Experiment):
         return self.intended_interaction
 
     def add_enacted_interaction(self, enacted_interaction):
+        if self.enacted_interactions is None:
+            self.enacted_interactions = []
         if enacted_interaction not in self.enacted_interactions:
             self.enacted_interactions.append(enacted_interaction)
 
     def get_enacted_interactions(self):
+        if self.enacted_interactions is None:
+            return []
         return self.enacted_interactions
@@ -1,14 +1,23 @@
 __author__ = 'katja'
 
 
-class Interaction:
+class Interaction(object):
     """
     An interaction is a basic sensorimotor pattern available to the agent.
     An interaction can be primitive or composite. If primitive, it is an association of experiment and result.
     If composite, it has pre- and post-interaction parts.
-    Each interaction has valence and weight.
+    Each interaction has valence and weight. The valence of a composite interaction is the sum of the valences of its
+    parts; it is stored when the composite is built and kept up to date when the valence of a part changes.
+    Interactions use __slots__, and their lists of alternative and composite interactions are only allocated when the
+    first element is added, since most learned interactions never get any.
+    The label of a composite and the sequence of primitive interactions it is made of are built the first time they are
+    needed and kept, as the parts of a composite never change.
     """
-    def __init__(self, label):
+    __slots__ = ('id', 'label', 'valence', 'experiment', 'result', 'meaning', 'weight', 'pre_interaction',
+                 'post_interaction', 'alternative_interactions', 'composite_interactions', 'sequence')
+
+    def __init__(self, label=None):
+        self.id = None
         self.label = label
         self.valence = 0
         self.experiment = None
@@ -17,9 +26,41 @@ class Interaction:
         self.weight = 0
         self.pre_interaction = None
         self.post_interaction = None
-        self.alternative_interactions = []
+        self.alternative_interactions = None
+        self.composite_interactions = None  # composites that have this interaction as pre- or post-interaction
+        self.sequence = None  # primitive interactions of a composite, in the order they are enacted
+
+    def get_id(self):
+        return self.id
+
+    def set_id(self, interaction_id):
+        self.id = interaction_id
 
     def get_label(self):
+        """
+        Labels of composite interactions, and of primitive ones created without a label, are built for display.
+        The label of a composite is built the first time it is needed and kept, like its sequence.
+        """
+        if self.label is not None:
+            return self.label
+        if self.is_primitive():
+            return self.experiment.get_label() + self.result.get_label()
+        # walk the parts without recursion, keeping the label of every composite built on the way
+        labels = []
+        stack = [(self, False)]
+        while stack:
+            interaction, expanded = stack.pop()
+            if expanded:
+                post_label = labels.pop()
+                pre_label = labels.pop()
+                interaction.label = "<" + pre_label + post_label + ">"
+                labels.append(interaction.label)
+            elif interaction.label is not None or interaction.pre_interaction is None:
+                labels.append(interaction.get_label())
+            else:
+                stack.append((interaction, True))
+                stack.append((interaction.post_interaction, False))
+                stack.append((interaction.pre_interaction, False))
         return self.label
 
     def get_experiment(self):
@@ -35,15 +76,17 @@ class Interaction:
         self.result = result
 
     def get_valence(self):
-        if self.is_primitive():
-            return self.valence
-        else:
-            pre = self.get_pre_interaction()
-            post = self.get_post_interaction()
-            return pre.get_valence() + post.get_valence()
+        return self.valence
 
     def set_valence(self, valence):
         self.valence = valence
+        if self.composite_interactions is not None:
+            for composite_interaction in self.composite_interactions:
+                composite_interaction.update_valence()
+
+    def update_valence(self):
+        """Recompute the valence of a composite interaction from its parts."""
+        self.set_valence(self.pre_interaction.get_valence() + self.post_interaction.get_valence())
 
     def get_meaning(self):
         return self.meaning
@@ -56,27 +99,84 @@ class Interaction:
 
     def set_pre_interaction(self, pre_interaction):
         self.pre_interaction = pre_interaction
+        pre_interaction.add_composite_interaction(self)
 
     def get_post_interaction(self):
         return self.post_interaction
 
     def set_post_interaction(self, post_interaction):
         self.post_interaction = post_interaction
+        post_interaction.add_composite_interaction(self)
 
     def is_primitive(self):
         return self.pre_interaction is None
 
+    def get_sequence(self):
+        """
+        :return: (tuple) of the primitive interactions enacted to enact this one; the valence of a composite is the
+        sum of their valences
+        """
+        if self.pre_interaction is None:
+            return self,
+        if self.sequence is None:
+            sequence = []
+            # walk the parts depth-first without recursion, reusing the sequences of those already built
+            stack = [self.post_interaction, self.pre_interaction]
+            while stack:
+                interaction = stack.pop()
+                if interaction.pre_interaction is None:
+                    sequence.append(interaction)
+                elif interaction.sequence is not None:
+                    sequence.extend(interaction.sequence)
+                else:
+                    stack.append(interaction.post_interaction)
+                    stack.append(interaction.pre_interaction)
+            self.sequence = tuple(sequence)
+        return self.sequence
+
+    def get_length(self):
+        """
+        :return: (int) number of primitive interactions enacted to enact this one
+        """
+        return len(self.get_sequence())
+
     def get_weight(self):
         return self.weight
 
+    def set_weight(self, weight):
+        self.weight = weight
+
     def increment_weight(self):
         self.weight += 1
 
+    def add_composite_interaction(self, interaction):
+        if self.composite_interactions is None:
+            self.composite_interactions = []
+        self.composite_interactions.append(interaction)
+
+    def remove_composite_interaction(self, interaction):
+        self.composite_interactions.remove(interaction)
+        if not self.composite_interactions:
+            self.composite_interactions = None
+
+    def get_composite_interactions(self):
+        if self.composite_interactions is None:
+            return ()
+        return self.composite_interactions
+
     def add_alternative_interaction(self, interaction):
-        if interaction not in self.alternative_interactions:
-            self.alternative_interactions.append(interaction)
+        if self.alternative_interactions is None:
+            self.alternative_interactions = set()
+        self.alternative_interactions.add(interaction)
+
+    def remove_alternative_interaction(self, interaction):
+        self.alternative_interactions.discard(interaction)
+        if not self.alternative_interactions:
+            self.alternative_interactions = None
 
     def get_alternative_interactions(self):
+        if self.alternative_interactions is None:
+            return ()
         return self.alternative_interactions
 
     def __repr__(self):
@@ -0,0 +1,259 @@
+import array
+import heapq
+from interaction import Interaction
+from result import FailedResult
+
+__author__ = 'katja'
+
+PRUNE_FRACTION = 0.1  # share of the budget freed by a pruning, so that memory is not pruned at every step
+
+
+def get_dependencies(interaction):
+    """
+    :return: (list) Interactions that an interaction is built on: the parts of a composite, and for a primitive, the
+    interaction of its abstract experiment and of its failed result
+    """
+    if not interaction.is_primitive():
+        return [interaction.get_pre_interaction(), interaction.get_post_interaction()]
+    dependencies = []
+    experiment = interaction.get_experiment()
+    if experiment is not None and experiment.is_abstract() and experiment.get_intended_interaction() is not interaction:
+        dependencies.append(experiment.get_intended_interaction())
+    if isinstance(interaction.get_result(), FailedResult):
+        dependencies.append(interaction.get_result().enacted_interaction)
+    return dependencies
+
+
+class InteractionMemory:
+    """
+    The interactions known to a single agent, interned under integer IDs.
+    Primitive interactions are found by a key chosen by the existence (e.g. their label, or their experiment and result).
+    Composite interactions are found by the IDs of their pre- and post-interaction, so keys do not grow with the depth
+    of the hierarchy. Composites are also indexed by their pre-interaction, so that the interactions activated by a
+    context can be retrieved without scanning the memory.
+    With a budget, the number of composite interactions is bounded: when the existence prunes the memory, the least
+    valuable composites are forgotten, along with the interactions built on them, and their IDs are given to the next
+    interactions learned. A composite is worth its weight plus the age of the memory when it was last learned or
+    reinforced, the age being the worth of the last composite forgotten (LFU with dynamic aging): composites that are
+    reinforced often are kept, and those that are not lose to newer ones as the memory ages.
+    """
+    def __init__(self, budget=None):
+        """
+        :param budget: (int) number of composite interactions kept when the memory is pruned; unbounded if None
+        """
+        self.interactions = []  # interaction ID -> Interaction, or None if the ID is free
+        self.primitive_ids = dict()  # key -> primitive interaction ID
+        self.composite_ids = dict()  # (pre-interaction ID, post-interaction ID) -> composite interaction ID
+        self.activations = dict()  # pre-interaction ID -> composite interactions built on it
+        self.primitive_interactions = None  # primitive interactions in ID order, listed when first needed
+        self.budget = budget
+        self.free_ids = []
+        self.age = 0
+        self.ages = array.array('l')  # interaction ID -> age of the memory when the interaction was last used
+
+    def __len__(self):
+        return len(self.interactions) - len(self.free_ids)
+
+    def __iter__(self):
+        if not self.free_ids:
+            return iter(self.interactions)
+        return (interaction for interaction in self.interactions if interaction is not None)
+
+    def get(self, interaction_id):
+        return self.interactions[interaction_id]
+
+    def add(self, interaction):
+        """
+        Intern an interaction under the next free ID.
+        :param interaction: (Interaction) interaction that is not yet in memory
+        :return: (Interaction) the same interaction, with its ID set
+        """
+        if self.free_ids:
+            interaction.set_id(self.free_ids.pop())
+            self.interactions[interaction.get_id()] = interaction
+            self.ages[interaction.get_id()] = self.age
+        else:
+            interaction.set_id(len(self.interactions))
+            self.interactions.append(interaction)
+            self.ages.append(self.age)
+        return interaction
+
+    def get_primitive(self, key):
+        """
+        :param key: key the primitive interaction was added under
+        :return: (Interaction) primitive interaction, or None if it is not known
+        """
+        if key in self.primitive_ids:
+            return self.interactions[self.primitive_ids[key]]
+        return None
+
+    def add_primitive(self, key, label=None):
+        """
+        Add a new primitive interaction.
+        :param key: hashable key to find the interaction by
+        :param label: (str) label of the interaction; if None, it is derived from its experiment and result
+        :return: (Interaction) new primitive interaction
+        """
+        interaction = self.add(Interaction(label))
+        self.primitive_ids[key] = interaction.get_id()
+        self.primitive_interactions = None
+        return interaction
+
+    def get_primitive_interactions(self):
+        """
+        :return: (list) of primitive Interactions in ID order; the same list until primitives are added or forgotten
+        """
+        if self.primitive_interactions is None:
+            self.primitive_interactions = [self.interactions[interaction_id]
+                                           for interaction_id in sorted(self.primitive_ids.values())]
+        return self.primitive_interactions
+
+    def get_composite(self, pre_interaction, post_interaction):
+        """
+        :return: (Interaction) composite interaction made of pre_interaction and post_interaction, or None if not known
+        """
+        key = (pre_interaction.get_id(), post_interaction.get_id())
+        if key in self.composite_ids:
+            # the composite is looked up to be learned or reinforced
+            interaction_id = self.composite_ids[key]
+            self.ages[interaction_id] = self.age
+            return self.interactions[interaction_id]
+        return None
+
+    def add_composite(self, pre_interaction, post_interaction):
+        """
+        Add a new composite interaction and index it under its pre-interaction.
+        :param pre_interaction: (Interaction) interaction enacted first
+        :param post_interaction: (Interaction) interaction enacted second
+        :return: (Interaction) new composite interaction
+        """
+        interaction = self.add(Interaction())
+        interaction.set_pre_interaction(pre_interaction)
+        interaction.set_post_interaction(post_interaction)
+        self.composite_ids[(pre_interaction.get_id(), post_interaction.get_id())] = interaction.get_id()
+        if pre_interaction.get_id() not in self.activations:
+            self.activations[pre_interaction.get_id()] = []
+        self.activations[pre_interaction.get_id()].append(interaction)
+        return interaction
+
+    def reinforce(self, interaction):
+        """Increment the weight of a composite interaction."""
+        interaction.increment_weight()
+
+    def get_activated_interactions(self, context_interaction):
+        """
+        :param context_interaction: (Interaction) interaction enacted in the current context
+        :return: (list) of composite Interactions whose pre-interaction is context_interaction
+        """
+        return self.activations.get(context_interaction.get_id(), [])
+
+    def count_activated_interactions(self, context_interaction):
+        """
+        :return: (int) number of composite Interactions whose pre-interaction is context_interaction
+        """
+        return len(self.activations.get(context_interaction.get_id(), ()))
+
+    def sum_activations(self, context_interactions, key=None):
+        """
+        Sum up what the composite interactions activated by a context propose. Each activated interaction proposes its
+        post-interaction with its weight, and with a proclivity of its weight times the valence of the post-interaction.
+        :param context_interactions: (list) of Interactions enacted in the current context
+        :param key: (function) what a post-interaction stands for, e.g. its experiment; proposals are summed by key, or
+        by post-interaction if None
+        :return: (list) of (post-interaction first proposed for a key, summed weight, summed proclivity), in the order
+        the keys were first proposed
+        """
+        proposals = []
+        proposed = dict()
+        for context_interaction in context_interactions:
+            for activated_interaction in self.get_activated_interactions(context_interaction):
+                post_interaction = activated_interaction.get_post_interaction()
+                weight = activated_interaction.get_weight()
+                proclivity = weight * post_interaction.get_valence()
+                proposal_key = key(post_interaction) if key is not None else post_interaction
+                if proposal_key in proposed:
+                    proposal = proposed[proposal_key]
+                    proposal[1] += weight
+                    proposal[2] += proclivity
+                else:
+                    proposal = [post_interaction, weight, proclivity]
+                    proposed[proposal_key] = proposal
+                    proposals.append(proposal)
+        return proposals
+
+    def get_worth(self, interaction_id):
+        return self.ages[interaction_id] + self.interactions[interaction_id].get_weight()
+
+    def prune(self, protected=()):
+        """
+        If there are more composite interactions than the budget, forget the least valuable ones until a fraction of
+        the budget is free again. The interactions built on a forgotten interaction are forgotten as well, and forgotten
+        interactions are removed from the activation index and from the alternatives of the others.
+        :param protected: (list) Interactions in use by the existence, which are kept along with all they are built on
+        :return: (list) forgotten Interactions
+        """
+        if self.budget is None or len(self.composite_ids) <= self.budget:
+            return []
+        kept = set()
+        stack = [interaction for interaction in protected if interaction is not None]
+        while stack:
+            interaction = stack.pop()
+            if interaction.get_id() not in kept:
+                kept.add(interaction.get_id())
+                stack.extend(get_dependencies(interaction))
+        # primitives built on other interactions (failed results of abstract experiments)
+        dependent_primitives = dict()  # interaction ID -> IDs of primitive interactions built on it
+        primitive_keys = dict()  # ID -> key of the primitive interactions built on other interactions
+        for key, interaction_id in self.primitive_ids.items():
+            for dependency in get_dependencies(self.interactions[interaction_id]):
+                dependent_primitives.setdefault(dependency.get_id(), []).append(interaction_id)
+                primitive_keys[interaction_id] = key
+
+        excess = len(self.composite_ids) - int(self.budget * (1 - PRUNE_FRACTION))
+        candidates = [interaction_id for interaction_id in self.composite_ids.itervalues() if interaction_id not in kept]
+        victims = heapq.nsmallest(excess, candidates, key=lambda interaction_id: (self.get_worth(interaction_id),
+                                                                                   interaction_id))
+        if not victims:
+            return []
+        self.age = self.get_worth(victims[-1])
+
+        forgotten = set()
+        stack = list(victims)
+        while stack:
+            interaction_id = stack.pop()
+            if interaction_id not in forgotten:
+                forgotten.add(interaction_id)
+                interaction = self.interactions[interaction_id]
+                stack.extend(composite.get_id() for composite in interaction.get_composite_interactions())
+                stack.extend(dependent_primitives.get(interaction_id, ()))
+
+        evicted = [self.interactions[interaction_id] for interaction_id in sorted(forgotten)]
+        contexts = set()  # IDs of the kept interactions that activated forgotten composites
+        for interaction in evicted:
+            interaction_id = interaction.get_id()
+            if interaction.is_primitive():
+                del self.primitive_ids[primitive_keys[interaction_id]]
+                self.primitive_interactions = None
+            else:
+                pre_id = interaction.get_pre_interaction().get_id()
+                del self.composite_ids[(pre_id, interaction.get_post_interaction().get_id())]
+                for part in get_dependencies(interaction):
+                    if part.get_id() not in forgotten:
+                        part.remove_composite_interaction(interaction)
+                if pre_id not in forgotten:
+                    contexts.add(pre_id)
+            self.activations.pop(interaction_id, None)
+            self.interactions[interaction_id] = None
+            self.free_ids.append(interaction_id)
+        for context_id in contexts:
+            activated = [composite for composite in self.activations[context_id] if composite.get_id() not in forgotten]
+            if activated:
+                self.activations[context_id] = activated
+            else:
+                del self.activations[context_id]
+        for interaction in self.interactions:
+            if interaction is not None:
+                for alternative_interaction in list(interaction.get_alternative_interactions()):
+                    if alternative_interaction.get_id() in forgotten:
+                        interaction.remove_alternative_interaction(alternative_interaction)
+        return evicted
@@ -0,0 +1,203 @@
+"""
+Profiling of the step loop of an existence, phase by phase.
+
+A Profiler is attached to an existence by replacing the methods that implement each phase (anticipate, select, enact,
+learn, prune), the call to the environment and the memory operations it counts, with timed and counted ones on that instance
+only. An existence without a profiler runs its own methods, so profiling costs nothing when it is not used.
+Times and counts are added up per step, and every step's values are kept in histograms, so that the cost of a phase can
+be followed as the memory grows.
+"""
+
+import math
+from existence import RecursiveExistence, ConstructiveExistence
+
+__author__ = 'katja'
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    try:
+        from time import monotonic as clock
+    except ImportError:
+        # Python 2 has no monotonic clock
+        from time import time as clock
+
+PHASES = ["anticipate", "select", "enact", "environment", "learn", "prune"]
+COUNTERS = ["activated", "anticipations", "new composites", "reinforcements", "forgotten"]
+
+
+class Histogram(object):
+    """
+    Distribution of non-negative values in buckets whose bounds are powers of two.
+    """
+    def __init__(self):
+        self.buckets = dict()  # exponent e -> number of values in [2 ** (e - 1), 2 ** e), 0 for values below 1
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def add(self, value):
+        bucket = math.frexp(value)[1] if value >= 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def export(self):
+        """
+        :return: (dict) count, total, mean and maximum of the values, and buckets as a list of (upper bound, count)
+        """
+        return {"count": self.count,
+                "total": self.total,
+                "mean": float(self.total) / self.count if self.count else None,
+                "max": self.maximum,
+                "buckets": [(2 ** bucket, self.buckets[bucket]) for bucket in sorted(self.buckets)]}
+
+
+class Profiler(object):
+    """
+    Times the phases of the steps of an existence and counts what they do.
+    Phases: anticipate, select, enact (for the simple existence, which consults the world directly from its step, the
+    same as environment), environment (the calls to the world, also part of enact), learn and prune (keeping the memory
+    within its budget).
+    Counters: interactions activated by the context, anticipations proposed, composite interactions added to memory,
+    composite interactions reinforced and interactions forgotten.
+    Subclasses can override add_time, add_count and end_step to handle the measurements differently.
+    """
+    def __init__(self, sample=None):
+        """
+        :param sample: (int) number of steps between two samples of the memory size and of the time of each phase
+        since the previous sample; no samples if None
+        """
+        self.sample = sample
+        self.steps = 0
+        self.seconds = dict((phase, 0.0) for phase in PHASES)  # phase -> time over all steps
+        self.calls = dict((phase, 0) for phase in PHASES)  # phase -> number of outermost calls
+        self.totals = dict((counter, 0) for counter in COUNTERS)  # counter -> count over all steps
+        self.phase_histograms = dict((phase, Histogram()) for phase in PHASES)  # microseconds per step
+        self.counter_histograms = dict((counter, Histogram()) for counter in COUNTERS)  # count per step
+        self.step_seconds = dict((phase, 0.0) for phase in PHASES)
+        self.step_counts = dict((counter, 0) for counter in COUNTERS)
+        self.samples = []
+        self.sample_seconds = dict((phase, 0.0) for phase in PHASES)
+
+    def add_time(self, phase, seconds):
+        self.seconds[phase] += seconds
+        self.calls[phase] += 1
+        self.step_seconds[phase] += seconds
+
+    def add_count(self, counter, count):
+        self.totals[counter] += count
+        self.step_counts[counter] += count
+
+    def end_step(self, existence):
+        """Close the measurements of a step."""
+        self.steps += 1
+        for phase in PHASES:
+            self.phase_histograms[phase].add(int(self.step_seconds[phase] * 1e6))
+            self.sample_seconds[phase] += self.step_seconds[phase]
+            self.step_seconds[phase] = 0.0
+        for counter in COUNTERS:
+            self.counter_histograms[counter].add(self.step_counts[counter])
+            self.step_counts[counter] = 0
+        if self.sample and self.steps % self.sample == 0:
+            self.samples.append({"step": self.steps, "memory_size": len(existence.memory),
+                                 "seconds": dict(self.sample_seconds)})
+            self.sample_seconds = dict((phase, 0.0) for phase in PHASES)
+
+    def export(self):
+        """
+        :return: (dict) the measurements, ready to be written as JSON
+        """
+        return {"steps": self.steps,
+                "phases": dict((phase, {"seconds": self.seconds[phase], "calls": self.calls[phase],
+                                        "microseconds_per_step": self.phase_histograms[phase].export()})
+                               for phase in PHASES),
+                "counters": dict((counter, {"total": self.totals[counter],
+                                            "per_step": self.counter_histograms[counter].export()})
+                                 for counter in COUNTERS),
+                "samples": self.samples}
+
+    def timed(self, phase, method):
+        """
+        :return: (function) method, timed as a phase. Only the outermost call is timed, so that a method that calls
+        itself, such as enact through abstract experiments, is not counted twice.
+        """
+        state = {"depth": 0}
+
+        def timed_method(*args):
+            state["depth"] += 1
+            if state["depth"] == 1:
+                start = clock()
+            try:
+                return method(*args)
+            finally:
+                state["depth"] -= 1
+                if state["depth"] == 0:
+                    self.add_time(phase, clock() - start)
+        return timed_method
+
+    def counted(self, counter, method, count=None):
+        """
+        :param count: (function) of the arguments and the return value of method giving the count; 1 per call if None
+        :return: (function) method, counted
+        """
+        def counted_method(*args):
+            value = method(*args)
+            self.add_count(counter, 1 if count is None else count(args, value))
+            return value
+        return counted_method
+
+    def attach(self, existence):
+        """
+        Instrument an existence. Attach the profiler once the existence has its final memory and environment, e.g.
+        after a snapshot is loaded, since they are instrumented as well.
+        """
+        memory = existence.memory
+        environment = existence.environment
+        existence.anticipate = self.counted("anticipations", self.timed("anticipate", existence.anticipate),
+                                            lambda args, anticipations: len(anticipations))
+        if isinstance(existence, ConstructiveExistence):
+            existence.select_interaction = self.timed("select", existence.select_interaction)
+        else:
+            existence.select_experiment = self.timed("select", existence.select_experiment)
+
+        if isinstance(existence, RecursiveExistence):
+            existence.enact = self.timed("enact", existence.enact)
+            existence.learn_recursive_interaction = self.timed("learn", existence.learn_recursive_interaction)
+            # composites are activated by several context interactions at once; they are counted before anticipate is
+            # timed, so that counting them does not add to its time
+            anticipate = existence.anticipate
+
+            def counted_anticipate():
+                context_interactions = existence.get_context_interactions()
+                self.add_count("activated", sum(memory.count_activated_interactions(context_interaction)
+                                                for context_interaction in context_interactions))
+                return anticipate()
+            existence.anticipate = counted_anticipate
+        else:
+            existence.learn_composite_interaction = self.timed("learn", existence.learn_composite_interaction)
+            existence.get_activated_interactions = self.counted("activated", existence.get_activated_interactions,
+                                                                lambda args, activated: len(activated))
+
+        if isinstance(existence, ConstructiveExistence):
+            environment.enact_primitive_interaction = self.timed("environment",
+                                                                 environment.enact_primitive_interaction)
+        elif isinstance(existence, RecursiveExistence):
+            environment.return_result = self.timed("environment", environment.return_result)
+        else:
+            # the simple existence consults the world directly from its step
+            environment.return_result = self.timed("enact", self.timed("environment", environment.return_result))
+
+        memory.add_composite = self.counted("new composites", memory.add_composite)
+        memory.reinforce = self.counted("reinforcements", memory.reinforce)
+        existence.prune_memory = self.counted("forgotten", self.timed("prune", existence.prune_memory),
+                                              lambda args, evicted: len(evicted))
+
+        step = existence.step
+
+        def profiled_step():
+            trace = step()
+            self.end_step(existence)
+            return trace
+        existence.step = profiled_step
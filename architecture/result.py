@@ -1,9 +1,26 @@
 __author__ = 'katja'
 
 
-class Result:
+class Result(object):
+    __slots__ = ('label',)
+
     def __init__(self, label):
         self.label = label
 
     def get_label(self):
         return self.label
+
+
+class FailedResult(Result):
+    """
+    Result of an abstract experiment whose intended interaction was not enacted. It is labelled after the interaction
+    that was enacted instead.
+    """
+    __slots__ = ('enacted_interaction',)
+
+    def __init__(self, enacted_interaction):
+        Result.__init__(self, None)
+        self.enacted_interaction = enacted_interaction
+
+    def get_label(self):
+        return self.enacted_interaction.get_label().upper()
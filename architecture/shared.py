@@ -0,0 +1,237 @@
+"""
+Share the interaction memory saved in a snapshot file between agents running in different processes.
+
+The file is mapped read-only, so its pages are kept once by the operating system however many agents map it. An agent
+only builds the interactions of the snapshot it reaches, and keeps them, with the interactions it learns afterwards,
+in a small overlay of its own: reinforcing an interaction of the snapshot changes the agent's copy, never the file.
+"""
+
+import bisect
+from interaction import Interaction
+from memory import InteractionMemory
+from result import FailedResult
+from snapshot import CONSTRUCTIVE, COMPOSITE, PRIMITIVE_BY_LABEL, get_existence_kind, map_snapshot
+
+__author__ = 'katja'
+
+
+class SharedInteractionMemory(InteractionMemory):
+    """
+    Interaction memory of an agent warm-started from a mapped snapshot.
+    Interactions keep their ID in the snapshot; those learned by the agent get the IDs that follow. The inherited
+    indexes and interaction list only hold what the agent learned: what it reached of the snapshot is kept apart.
+    Iterating over the memory builds every interaction of the snapshot.
+    """
+    def __init__(self, existence, snapshot):
+        """
+        :param existence: (Existence) existence that provides the experiments and results of the interactions
+        :param snapshot: (Snapshot) mapped snapshot saved from the same kind of existence
+        """
+        InteractionMemory.__init__(self)
+        self.kind = get_existence_kind(existence)
+        if self.kind != snapshot.kind:
+            raise ValueError("snapshot of a different kind of existence ({0} instead of {1})".format(snapshot.kind,
+                                                                                                   self.kind))
+        self.existence = existence
+        self.snapshot = snapshot
+        self.base_size = len(snapshot)
+        self.built = dict()  # snapshot interaction ID -> Interaction built from it
+        self.base_activations = dict()  # snapshot interaction ID -> composite Interactions of the snapshot built on it
+        self.experiment_labels = [snapshot.strings[index] for index in snapshot.experiments]
+        for label in self.experiment_labels:
+            if label not in existence.experiments:
+                raise ValueError("experiment {0} of the snapshot is unknown to the existence".format(label))
+        self.result_labels = [snapshot.strings[index] for index in snapshot.results]
+        self.base_primitive_ids = dict()  # reference key -> snapshot primitive interaction ID
+        for interaction_id in snapshot.primitives:
+            self.base_primitive_ids[self.get_base_key(interaction_id)] = interaction_id
+
+    def get_base_key(self, interaction_id):
+        """
+        :return: reference key of a primitive interaction of the snapshot (see get_reference_key)
+        """
+        first = self.snapshot.first[interaction_id]
+        if self.snapshot.kinds[interaction_id] == PRIMITIVE_BY_LABEL:
+            return self.snapshot.strings[first]
+        second = self.snapshot.second[interaction_id]
+        experiment = self.experiment_labels[first] if first >= 0 else first
+        result = self.result_labels[second] if second >= 0 else second
+        return experiment, result
+
+    def get_reference_key(self, key):
+        """
+        Labels are the same in every process, but experiments and results are not: the experiment and result of a key
+        are written as their label, or, for an abstract experiment or a failed result, as -1 - ID of its interaction.
+        :param key: key the existence finds a primitive interaction by
+        :return: key of the same primitive interaction in the snapshot
+        """
+        if self.kind == CONSTRUCTIVE:
+            return key
+        experiment, result = key
+        if experiment.is_abstract():
+            experiment = -1 - experiment.get_intended_interaction().get_id()
+        else:
+            experiment = experiment.get_label()
+        if isinstance(result, FailedResult):
+            result = -1 - result.enacted_interaction.get_id()
+        else:
+            result = result.get_label()
+        return experiment, result
+
+    def adopt(self, memory):
+        """
+        Take over the primitive interactions an existence was initialized with, so that the existence's experiments
+        keep referring to them. Those in the snapshot take its ID and learned values.
+        :param memory: (InteractionMemory) memory of an existence that has not learned composite interactions yet
+        """
+        if memory.composite_ids:
+            raise ValueError("the existence has already learned composite interactions")
+        adopted = []
+        for key, interaction_id in sorted(memory.primitive_ids.items(), key=lambda item: item[1]):
+            interaction = memory.get(interaction_id)
+            base_id = self.base_primitive_ids.get(self.get_reference_key(key))
+            if base_id is None:
+                self.primitive_ids[key] = self.add(interaction).get_id()
+            else:
+                interaction.set_id(base_id)
+                self.built[base_id] = interaction
+                adopted.append(interaction)
+        # only read the snapshot once all are adopted, as their alternatives may refer to each other
+        for interaction in adopted:
+            self.read(interaction)
+
+    def build(self, interaction_id):
+        """
+        Build an interaction of the snapshot, and the interactions it is made of if the agent has not reached them yet.
+        """
+        snapshot = self.snapshot
+        existence = self.existence
+        kind = snapshot.kinds[interaction_id]
+        first = snapshot.first[interaction_id]
+        second = snapshot.second[interaction_id]
+        if kind == COMPOSITE:
+            pre_interaction = self.get(first)
+            post_interaction = self.get(second)
+            interaction = Interaction()
+            interaction.set_id(interaction_id)
+            interaction.set_pre_interaction(pre_interaction)
+            interaction.set_post_interaction(post_interaction)
+            existence.initialize_composite_interaction(interaction)
+        elif kind == PRIMITIVE_BY_LABEL:
+            interaction = Interaction(snapshot.strings[first])
+            interaction.set_id(interaction_id)
+            existence.addget_abstract_experiment(interaction)
+        else:
+            interaction = Interaction()
+            interaction.set_id(interaction_id)
+            if first >= 0:
+                interaction.set_experiment(existence.experiments[self.experiment_labels[first]])
+            else:
+                interaction.set_experiment(self.get(-1 - first).get_experiment())
+            if second >= 0:
+                interaction.set_result(existence.addget_result(self.result_labels[second]))
+            else:
+                interaction.set_result(existence.addget_failed_result(self.get(-1 - second)))
+        self.built[interaction_id] = interaction
+        self.read(interaction)
+        return interaction
+
+    def read(self, interaction):
+        """Give an interaction of the snapshot the values learned for it."""
+        snapshot = self.snapshot
+        interaction_id = interaction.get_id()
+        if interaction.is_primitive():
+            interaction.set_valence(snapshot.get_valence(interaction_id))
+            interaction.set_meaning(snapshot.get_string(snapshot.meanings[interaction_id]))
+        interaction.set_weight(snapshot.weights[interaction_id])
+        # alternatives are stored in order of their owner
+        start = bisect.bisect_left(snapshot.alternative_owners, interaction_id)
+        end = bisect.bisect_right(snapshot.alternative_owners, interaction_id, start)
+        for alternative_id in snapshot.alternatives.get_range(start, end):
+            interaction.add_alternative_interaction(self.get(alternative_id))
+
+    def __len__(self):
+        return self.base_size + len(self.interactions)
+
+    def __iter__(self):
+        for interaction_id in range(0, len(self)):
+            yield self.get(interaction_id)
+
+    def get(self, interaction_id):
+        if interaction_id >= self.base_size:
+            return self.interactions[interaction_id - self.base_size]
+        interaction = self.built.get(interaction_id)
+        if interaction is None:
+            interaction = self.build(interaction_id)
+        return interaction
+
+    def add(self, interaction):
+        interaction.set_id(self.base_size + len(self.interactions))
+        self.interactions.append(interaction)
+        return interaction
+
+    def get_primitive(self, key):
+        if key in self.primitive_ids:
+            return self.get(self.primitive_ids[key])
+        base_id = self.base_primitive_ids.get(self.get_reference_key(key))
+        if base_id is not None:
+            return self.get(base_id)
+        return None
+
+    def get_primitive_interactions(self):
+        if self.primitive_interactions is None:
+            learned = [self.get(interaction_id) for interaction_id in sorted(self.primitive_ids.values())]
+            self.primitive_interactions = [self.get(interaction_id) for interaction_id in self.snapshot.primitives] + \
+                learned
+        return self.primitive_interactions
+
+    def get_composite(self, pre_interaction, post_interaction):
+        key = (pre_interaction.get_id(), post_interaction.get_id())
+        if key in self.composite_ids:
+            return self.get(self.composite_ids[key])
+        pre_id, post_id = key
+        if pre_id < self.base_size and post_id < self.base_size:
+            snapshot = self.snapshot
+            start = snapshot.activation_offsets[pre_id]
+            end = snapshot.activation_offsets[pre_id + 1]
+            for interaction_id in snapshot.activations.get_range(start, end):
+                if snapshot.second[interaction_id] == post_id:
+                    return self.get(interaction_id)
+        return None
+
+    def get_activated_interactions(self, context_interaction):
+        context_id = context_interaction.get_id()
+        learned = self.activations.get(context_id, [])
+        if context_id >= self.base_size:
+            return learned
+        activated = self.base_activations.get(context_id)
+        if activated is None:
+            start = self.snapshot.activation_offsets[context_id]
+            end = self.snapshot.activation_offsets[context_id + 1]
+            activated = [self.get(interaction_id) for interaction_id in self.snapshot.activations.get_range(start, end)]
+            self.base_activations[context_id] = activated
+        if learned:
+            return activated + learned
+        return activated
+
+    def count_activated_interactions(self, context_interaction):
+        # counted from the index, without building the interactions of the snapshot
+        context_id = context_interaction.get_id()
+        count = len(self.activations.get(context_id, ()))
+        if context_id < self.base_size:
+            count += self.snapshot.activation_offsets[context_id + 1] - self.snapshot.activation_offsets[context_id]
+        return count
+
+
+def share_memory(existence, path):
+    """
+    Warm-start an existence with the memory saved in a snapshot file, mapped rather than loaded (see load_memory).
+    :param existence: (Existence) existence initialized with the same primitive interactions as the saved one, that
+    has not learned yet
+    :param path: (str) file written by save_memory
+    :return: (SharedInteractionMemory) the new memory of the existence
+    """
+    memory = SharedInteractionMemory(existence, map_snapshot(path))
+    memory.adopt(existence.memory)
+    existence.memory = memory
+    return memory
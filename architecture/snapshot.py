@@ -0,0 +1,375 @@
+"""
+Save the interaction memory learned by an existence to a compact binary file and load it back.
+
+The file holds a header, a string table, the labels of the primitive experiments and results, and the interactions as
+columns (kind, first and second reference, weight, valence, meaning), each after the interactions it is built on; the
+position of an interaction in the file is its ID in the snapshot. They are followed by the alternative interactions as
+(interaction ID, alternative ID) pairs, the IDs of the primitive interactions and the activation index: for every
+interaction, the offset of its composites in a list of composite IDs grouped by pre-interaction. References are:
+- for composites: the IDs of the pre- and post-interaction,
+- for primitives found by label (constructive existence): the label in the string table,
+- for primitives of an experiment and a result: the experiment and result index, or, when negative, -1 - ID of the
+  interaction whose abstract experiment (resp. failed result) it is.
+Abstract experiments are not stored: they are rebuilt by the existence when the composites are restored.
+Strings are stored UTF-8 encoded, and an interaction without a valence is stored with a valence of NaN.
+All numbers are little-endian, so that a mapped file can be read in place (see architecture.shared).
+"""
+
+import array
+import mmap
+import struct
+import sys
+from existence import RecursiveExistence, ConstructiveExistence
+from memory import get_dependencies
+from result import FailedResult
+
+__author__ = 'katja'
+
+MAGIC = 'EAMS'
+VERSION = 2
+HEADER = struct.Struct('<4sHB')
+COUNT = struct.Struct('<I')
+
+NO_VALENCE = float('nan')
+
+# kinds of existence
+SIMPLE = 0
+RECURSIVE = 1
+CONSTRUCTIVE = 2
+
+# kinds of interaction records
+PRIMITIVE_BY_LABEL = 0
+PRIMITIVE = 1
+COMPOSITE = 2
+
+
+def get_existence_kind(existence):
+    if isinstance(existence, ConstructiveExistence):
+        return CONSTRUCTIVE
+    elif isinstance(existence, RecursiveExistence):
+        return RECURSIVE
+    return SIMPLE
+
+
+def write_array(f, column):
+    if sys.byteorder != 'little':
+        column = array.array(column.typecode, column)
+        column.byteswap()
+    f.write(COUNT.pack(len(column)))
+    column.tofile(f)
+
+
+def read_array(buffer, offset, typecode):
+    """
+    :return: (array, int) column read from buffer at offset, and the offset just after it
+    """
+    count = COUNT.unpack_from(buffer, offset)[0]
+    offset += COUNT.size
+    column = array.array(typecode)
+    end = offset + count * column.itemsize
+    column.fromstring(buffer[offset:end])
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column, end
+
+
+class MappedColumn(object):
+    """
+    Read-only view of a column of a snapshot held in a memory map: items are unpacked from the map when they are read,
+    so the column takes no memory of its own.
+    """
+    __slots__ = ('buffer', 'offset', 'count', 'typecode', 'item')
+
+    def __init__(self, buffer, offset, count, typecode):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.typecode = typecode
+        self.item = struct.Struct('<' + typecode)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("column index out of range")
+        return self.item.unpack_from(self.buffer, self.offset + index * self.item.size)[0]
+
+    def get_range(self, start, end):
+        """
+        :return: (tuple) items start to end (excluded)
+        """
+        return struct.unpack_from('<{0}{1}'.format(end - start, self.typecode), self.buffer,
+                                  self.offset + start * self.item.size)
+
+
+def map_array(buffer, offset, typecode):
+    """
+    :return: (MappedColumn, int) column of buffer at offset, and the offset just after it
+    """
+    count = COUNT.unpack_from(buffer, offset)[0]
+    offset += COUNT.size
+    column = MappedColumn(buffer, offset, count, typecode)
+    return column, offset + count * column.item.size
+
+
+class StringTable:
+    """Interns the strings of a snapshot, which are written once and referred to by index."""
+    def __init__(self):
+        self.strings = []
+        self.indexes = dict()
+
+    def index(self, string):
+        if string is None:
+            return -1
+        if string not in self.indexes:
+            self.indexes[string] = len(self.strings)
+            self.strings.append(string)
+        return self.indexes[string]
+
+    def write(self, f):
+        data = [encode_string(string) for string in self.strings]
+        write_array(f, array.array('i', [len(string) for string in data]))
+        f.write(''.join(data))
+
+
+def encode_string(string):
+    """
+    :return: (str) string as UTF-8 bytes; meanings read from JSON are unicode
+    """
+    if isinstance(string, unicode):
+        return string.encode('utf-8')
+    return string
+
+
+def decode_string(data):
+    """
+    :return: (str or unicode) string of UTF-8 bytes, kept as str if it is ASCII, as the labels of the agents are
+    """
+    string = data.decode('utf-8')
+    try:
+        return str(string)
+    except UnicodeEncodeError:
+        return string
+
+
+def get_snapshot_order(memory):
+    """
+    Order the interactions of a memory so that each comes after those it is built on. Interactions are created in that
+    order, but once memory is pruned, new interactions can take the lower IDs of forgotten ones.
+    :return: (list, dict) Interactions in order, and interaction ID -> position in that order
+    """
+    order = []
+    indexes = dict()
+    for interaction in memory:
+        stack = [(interaction, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current.get_id() in indexes:
+                continue
+            if expanded:
+                indexes[current.get_id()] = len(order)
+                order.append(current)
+            else:
+                stack.append((current, True))
+                stack.extend((dependency, False) for dependency in reversed(get_dependencies(current)))
+    return order, indexes
+
+
+def save_memory(existence, path):
+    """
+    Write the experiments, results and interactions known to an existence to a snapshot file.
+    :param existence: (Existence) existence whose memory is saved
+    :param path: (str) file to write
+    """
+    strings = StringTable()
+    experiment_labels = sorted(existence.experiments)
+    experiment_indexes = dict((existence.experiments[label], i) for i, label in enumerate(experiment_labels))
+    result_labels = sorted(existence.results)
+    result_indexes = dict((existence.results[label], i) for i, label in enumerate(result_labels))
+
+    kinds = array.array('b')
+    first = array.array('i')
+    second = array.array('i')
+    weights = array.array('i')
+    valences = array.array('d')
+    meanings = array.array('i')
+    alternatives = array.array('i')
+    alternative_owners = array.array('i')
+    primitives = array.array('i')
+    activation_offsets = array.array('i', [0])
+    activations = array.array('i')
+    order, indexes = get_snapshot_order(existence.memory)
+    for interaction in order:
+        if not interaction.is_primitive():
+            kinds.append(COMPOSITE)
+            first.append(indexes[interaction.get_pre_interaction().get_id()])
+            second.append(indexes[interaction.get_post_interaction().get_id()])
+        elif interaction.get_result() is None:
+            primitives.append(indexes[interaction.get_id()])
+            kinds.append(PRIMITIVE_BY_LABEL)
+            first.append(strings.index(interaction.get_label()))
+            second.append(-1)
+        else:
+            primitives.append(indexes[interaction.get_id()])
+            kinds.append(PRIMITIVE)
+            experiment = interaction.get_experiment()
+            if experiment in experiment_indexes:
+                first.append(experiment_indexes[experiment])
+            else:
+                first.append(-1 - indexes[experiment.get_intended_interaction().get_id()])
+            result = interaction.get_result()
+            if isinstance(result, FailedResult):
+                second.append(-1 - indexes[result.enacted_interaction.get_id()])
+            else:
+                second.append(result_indexes[result])
+        weights.append(interaction.get_weight())
+        valences.append(NO_VALENCE if interaction.get_valence() is None else interaction.get_valence())
+        meanings.append(strings.index(interaction.get_meaning()))
+        for alternative_interaction in interaction.get_alternative_interactions():
+            alternative_owners.append(indexes[interaction.get_id()])
+            alternatives.append(indexes[alternative_interaction.get_id()])
+        activations.extend(indexes[composite.get_id()]
+                           for composite in existence.memory.get_activated_interactions(interaction))
+        activation_offsets.append(len(activations))
+
+    experiments = array.array('i', [strings.index(label) for label in experiment_labels])
+    results = array.array('i', [strings.index(label) for label in result_labels])
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, get_existence_kind(existence)))
+        strings.write(f)
+        for column in (experiments, results, kinds, first, second, weights, valences, meanings,
+                       alternative_owners, alternatives, primitives, activation_offsets, activations):
+            write_array(f, column)
+
+
+class Snapshot:
+    """
+    Columns of a snapshot file, read from a string or from a read-only memory map of the file.
+    If mapped, the interaction columns are not read but viewed in place, and the map must stay open while they are used.
+    """
+    def __init__(self, buffer, mapped=False):
+        magic, version, self.kind = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an interaction memory snapshot of version {0}".format(VERSION))
+        offset = HEADER.size
+        lengths, offset = read_array(buffer, offset, 'i')
+        self.strings = []
+        for length in lengths:
+            self.strings.append(decode_string(buffer[offset:offset + length]))
+            offset += length
+        self.experiments, offset = read_array(buffer, offset, 'i')
+        self.results, offset = read_array(buffer, offset, 'i')
+        column = map_array if mapped else read_array
+        self.kinds, offset = column(buffer, offset, 'b')
+        self.first, offset = column(buffer, offset, 'i')
+        self.second, offset = column(buffer, offset, 'i')
+        self.weights, offset = column(buffer, offset, 'i')
+        self.valences, offset = column(buffer, offset, 'd')
+        self.meanings, offset = column(buffer, offset, 'i')
+        self.alternative_owners, offset = column(buffer, offset, 'i')
+        self.alternatives, offset = column(buffer, offset, 'i')
+        self.primitives, offset = column(buffer, offset, 'i')
+        self.activation_offsets, offset = column(buffer, offset, 'i')
+        self.activations, offset = column(buffer, offset, 'i')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def get_string(self, index):
+        if index < 0:
+            return None
+        return self.strings[index]
+
+    def get_valence(self, index):
+        # valences are stored as floats; give back the integers the primitive interactions were declared with
+        valence = self.valences[index]
+        if valence != valence:
+            # NaN stands for no valence
+            return None
+        if valence == int(valence):
+            return int(valence)
+        return valence
+
+    def restore(self, existence):
+        """
+        Add the snapshot's interactions to an existence initialized with the same primitive experiments.
+        :return: (list) of the existence's Interactions, indexed by their ID in the snapshot
+        """
+        kind = get_existence_kind(existence)
+        if kind != self.kind:
+            raise ValueError("snapshot of a different kind of existence ({0} instead of {1})".format(self.kind, kind))
+        experiments = []
+        for index in self.experiments:
+            label = self.strings[index]
+            if label not in existence.experiments:
+                raise ValueError("experiment {0} of the snapshot is unknown to the existence".format(label))
+            experiments.append(existence.experiments[label])
+        results = [existence.addget_result(self.strings[index]) for index in self.results]
+
+        interactions = []
+        for i in range(0, len(self)):
+            first = self.first[i]
+            second = self.second[i]
+            if self.kinds[i] == COMPOSITE:
+                pre_interaction = interactions[first]
+                post_interaction = interactions[second]
+                interaction = existence.memory.get_composite(pre_interaction, post_interaction)
+                if interaction is None:
+                    interaction = existence.memory.add_composite(pre_interaction, post_interaction)
+                    existence.initialize_composite_interaction(interaction)
+            else:
+                if self.kinds[i] == PRIMITIVE_BY_LABEL:
+                    interaction = existence.addget_interaction(self.strings[first])
+                    existence.addget_abstract_experiment(interaction)
+                else:
+                    if first >= 0:
+                        experiment = experiments[first]
+                    else:
+                        experiment = interactions[-1 - first].get_experiment()
+                    if second >= 0:
+                        result = results[second]
+                    else:
+                        result = existence.addget_failed_result(interactions[-1 - second])
+                    interaction = existence.addget_primitive_interaction(experiment, result)
+                interaction.set_valence(self.get_valence(i))
+                interaction.set_meaning(self.get_string(self.meanings[i]))
+            interaction.set_weight(self.weights[i])
+            interactions.append(interaction)
+
+        for owner, alternative in zip(self.alternative_owners, self.alternatives):
+            interactions[owner].add_alternative_interaction(interactions[alternative])
+        return interactions
+
+
+def read_snapshot(path):
+    """
+    Read a snapshot file.
+    :param path: (str) file written by save_memory
+    :return: (Snapshot)
+    """
+    with open(path, 'rb') as f:
+        return Snapshot(f.read())
+
+
+def map_snapshot(path):
+    """
+    Map a snapshot file read-only without reading its interactions, which are then viewed in place.
+    The pages of the map are shared with every other process that maps the same file.
+    :param path: (str) file written by save_memory
+    :return: (Snapshot) mapped snapshot; the map is closed when the snapshot is no longer referenced
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Snapshot(buffer, mapped=True)
+
+
+def load_memory(existence, path):
+    """
+    Warm-start an existence with the memory saved in a snapshot file.
+    :param existence: (Existence) existence initialized with the same primitive interactions as the saved one
+    :param path: (str) file written by save_memory
+    """
+    read_snapshot(path).restore(existence)
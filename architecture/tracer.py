@@ -0,0 +1,53 @@
+import sys
+
+__author__ = 'katja'
+
+OFF = 0
+INFO = 1  # what the agent intends, enacts and learns at every step
+DEBUG = 2  # context, activations and anticipations behind every decision
+
+LEVELS = {"off": OFF, "info": INFO, "debug": DEBUG}
+
+
+class Tracer(object):
+    """
+    Leveled trace of the agent's activity, written to a stream in batches of lines.
+    A message is only formatted when its level is enabled, so a disabled tracer costs one comparison per call.
+    Callers that would need to do work just to build the arguments of a message check is_enabled() first.
+    """
+    def __init__(self, level=OFF, stream=None, buffer_size=256):
+        """
+        :param level: (int) most detailed level that is written (OFF, INFO or DEBUG)
+        :param stream: (file) where the trace is written; stdout if None
+        :param buffer_size: (int) number of lines kept before they are written out
+        """
+        self.level = level
+        self.stream = stream if stream is not None else sys.stdout
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def is_enabled(self, level):
+        return level <= self.level
+
+    def info(self, message, *args):
+        if self.level >= INFO:
+            self.write(message, args)
+
+    def debug(self, message, *args):
+        if self.level >= DEBUG:
+            self.write(message, args)
+
+    def write(self, message, args):
+        """Format a message with its arguments and add it to the buffer."""
+        if args:
+            message = message % args
+        self.buffer.append(message)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered lines to the stream."""
+        if self.buffer:
+            self.stream.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+        self.stream.flush()
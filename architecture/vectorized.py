@@ -0,0 +1,123 @@
+"""
+Interaction memory that sums up what activated interactions propose with NumPy.
+
+The weights of the composite interactions are kept in an array indexed by interaction ID, and the interactions activated
+by each context are described by arrays of their IDs, of the valences of their post-interactions and of the keys these
+stand for. Anticipating then takes one gather of the weights, one multiplication and one bincount per step, whatever the
+number of activated interactions. The arrays of a context are built when it is first activated, and again when
+composites are added to it; valences are assumed not to change once composites are built on them.
+NumPy is optional: this module can be imported without it, but the memory cannot be created.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from memory import InteractionMemory
+
+__author__ = 'katja'
+
+
+class Activations(object):
+    """Arrays describing the composite interactions activated by one context interaction."""
+    __slots__ = ('interactions', 'size', 'ids', 'codes', 'valences', 'post_interactions')
+
+    def __init__(self, interactions, codes, key):
+        """
+        :param interactions: (list) of activated composite Interactions, as indexed by the memory
+        :param codes: (dict) key -> code of the keys already met, to which new keys are added
+        :param key: (function) what a post-interaction stands for, or None for the post-interaction itself
+        """
+        self.interactions = interactions
+        self.size = len(interactions)
+        self.post_interactions = [interaction.get_post_interaction() for interaction in interactions]
+        keys = self.post_interactions if key is None else [key(post) for post in self.post_interactions]
+        self.codes = numpy.array([codes.setdefault(k, len(codes)) for k in keys], dtype=numpy.intp)
+        self.ids = numpy.array([interaction.get_id() for interaction in interactions], dtype=numpy.intp)
+        self.valences = numpy.array([post.get_valence() for post in self.post_interactions])
+
+    def is_valid(self, interactions):
+        # composites are only appended to the list of a context; pruning replaces the list
+        return self.interactions is interactions and self.size == len(interactions)
+
+
+class VectorizedInteractionMemory(InteractionMemory):
+    """
+    Interaction memory whose sum_activations is computed with NumPy arrays rather than one interaction at a time.
+    Weights must be changed through reinforce once an interaction is activated, so that the array stays up to date.
+    """
+    def __init__(self, budget=None):
+        if numpy is None:
+            raise ImportError("the vectorized interaction memory needs NumPy")
+        InteractionMemory.__init__(self, budget)
+        self.weights = numpy.zeros(64, dtype=numpy.int64)  # interaction ID -> weight
+        self.cache = dict()  # (context interaction ID, key) -> Activations
+        self.codes = dict()  # key -> (dict) key of a post-interaction -> code
+
+    def add(self, interaction):
+        InteractionMemory.add(self, interaction)
+        interaction_id = interaction.get_id()
+        if interaction_id >= len(self.weights):
+            weights = numpy.zeros(2 * len(self.weights), dtype=self.weights.dtype)
+            weights[:len(self.weights)] = self.weights
+            self.weights = weights
+        self.weights[interaction_id] = interaction.get_weight()
+        return interaction
+
+    def reinforce(self, interaction):
+        InteractionMemory.reinforce(self, interaction)
+        self.weights[interaction.get_id()] += 1
+
+    def prune(self, protected=()):
+        evicted = InteractionMemory.prune(self, protected)
+        if evicted:
+            # IDs are given to new interactions, and keys may stand for forgotten ones
+            self.cache.clear()
+            self.codes.clear()
+        return evicted
+
+    def get_activations(self, context_interaction, key):
+        """
+        :return: (Activations) of the composites activated by context_interaction, or None if there are none
+        """
+        interactions = self.get_activated_interactions(context_interaction)
+        if not interactions:
+            return None
+        cache_key = (context_interaction.get_id(), key)
+        activations = self.cache.get(cache_key)
+        if activations is None or not activations.is_valid(interactions):
+            activations = Activations(interactions, self.codes.setdefault(key, dict()), key)
+            # weights set directly, e.g. when a snapshot is loaded, are read when the context is first activated
+            self.weights[activations.ids] = [interaction.get_weight() for interaction in interactions]
+            self.cache[cache_key] = activations
+        return activations
+
+    def sum_activations(self, context_interactions, key=None):
+        all_activations = [self.get_activations(context_interaction, key) for context_interaction in context_interactions]
+        all_activations = [activations for activations in all_activations if activations is not None]
+        if not all_activations:
+            return []
+        if len(all_activations) == 1:
+            ids = all_activations[0].ids
+            codes = all_activations[0].codes
+            valences = all_activations[0].valences
+            post_interactions = all_activations[0].post_interactions
+        else:
+            ids = numpy.concatenate([activations.ids for activations in all_activations])
+            codes = numpy.concatenate([activations.codes for activations in all_activations])
+            valences = numpy.concatenate([activations.valences for activations in all_activations])
+            post_interactions = [post for activations in all_activations for post in activations.post_interactions]
+
+        weights = self.weights[ids]
+        proclivities = weights * valences
+        # number the keys in the order they are first proposed
+        unique_codes, first, inverse = numpy.unique(codes, return_index=True, return_inverse=True)
+        order = numpy.argsort(first)
+        ranks = numpy.empty_like(order)
+        ranks[order] = numpy.arange(len(order))
+        groups = ranks[inverse]
+        # bincount sums in floating point, which is exact for the integer weights and valences of the agents
+        weight_sums = numpy.bincount(groups, weights=weights).astype(weights.dtype)
+        proclivity_sums = numpy.bincount(groups, weights=proclivities).astype(proclivities.dtype)
+        return [[post_interactions[index], weight, proclivity] for index, weight, proclivity in
+                zip(first[order].tolist(), weight_sums.tolist(), proclivity_sums.tolist())]
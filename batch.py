@@ -0,0 +1,187 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+from visualizer import canvas
+from environment import TestEnvironmentD1, TestEnvironmentD2, TestEnvironment, Environment, ConstructiveEnvironment, \
+    TEST_ACTIONS, REAL_ACTIONS
+from architecture.existence import Existence, RecursiveExistence, ConstructiveExistence
+from architecture.memory import InteractionMemory
+from architecture.vectorized import VectorizedInteractionMemory
+from architecture.snapshot import load_memory
+from architecture.shared import share_memory
+
+__author__ = 'katja'
+
+TEST_PRIMITIVE_INTERACTIONS = TEST_ACTIONS.get_primitive_interactions()
+
+REAL_PRIMITIVE_INTERACTIONS = REAL_ACTIONS.get_primitive_interactions()
+
+
+def create_existence(mechanism, world, primitive_interactions=None, budget=None, vectorized=False):
+    """
+    Create a headless existence in its environment.
+    :param mechanism: (str) learning mechanism (simple, recursive, constructive)
+    :param world: (str) environment (test, real)
+    :param primitive_interactions: (dict) of primitive interactions; the default set of the world if None
+    :param budget: (int) number of composite interactions the existence keeps; unbounded if None
+    :param vectorized: (bool) sum up anticipations with NumPy
+    :return: (Existence)
+    """
+    memory = VectorizedInteractionMemory(budget) if vectorized else InteractionMemory(budget)
+    if world == "real":
+        if primitive_interactions is None:
+            primitive_interactions = REAL_PRIMITIVE_INTERACTIONS
+        # pick random start location
+        start_location = (random.randint(canvas.BORDER, canvas.WIDTH-canvas.BORDER),
+                          random.randint(canvas.BORDER, canvas.HEIGHT-canvas.BORDER))
+        agent = canvas.Agent(start_location)
+        if mechanism == "simple":
+            return Existence(primitive_interactions, Environment(agent), memory=memory)
+        elif mechanism == "recursive":
+            return RecursiveExistence(primitive_interactions, Environment(agent), memory=memory)
+        elif mechanism == "constructive":
+            return ConstructiveExistence(primitive_interactions, ConstructiveEnvironment(agent), memory=memory)
+    elif world == "test":
+        if primitive_interactions is None:
+            primitive_interactions = TEST_PRIMITIVE_INTERACTIONS
+        if mechanism == "simple":
+            return Existence(primitive_interactions, TestEnvironmentD1(), memory=memory)
+        elif mechanism == "recursive":
+            return RecursiveExistence(primitive_interactions, TestEnvironmentD2(), memory=memory)
+        elif mechanism == "constructive":
+            return ConstructiveExistence(primitive_interactions, TestEnvironment(), memory=memory)
+    raise ValueError("unknown mechanism {0} or world {1}".format(mechanism, world))
+
+
+def make_grid(mechanisms, worlds, seeds, steps, primitive_interactions=(None,), memory=None, shared=False,
+              budget=None, vectorized=False):
+    """
+    Build the list of runs for a parameter sweep.
+    :param mechanisms: (list) of mechanism names
+    :param worlds: (list) of world names
+    :param seeds: (list) of random seeds
+    :param steps: (int) number of steps of every run
+    :param primitive_interactions: (list) of primitive interaction tables; None stands for the default of the world
+    :param memory: (str) snapshot file every run is warm-started from, or None to start from scratch
+    :param shared: (bool) share the snapshot between the runs instead of giving each a copy of it
+    :param budget: (int) number of composite interactions every existence keeps; unbounded if None
+    :param vectorized: (bool) sum up anticipations with NumPy
+    :return: (list) of run configurations, one per combination
+    """
+    if shared and (budget is not None or vectorized):
+        # a shared memory replaces the memory the existence was created with
+        raise ValueError("a shared memory has no budget and is not vectorized")
+    runs = []
+    for mechanism, world, table, seed in itertools.product(mechanisms, worlds, primitive_interactions, seeds):
+        runs.append({"mechanism": mechanism, "world": world, "primitive_interactions": table,
+                     "seed": seed, "steps": steps, "memory": memory, "shared": shared,
+                     "budget": budget, "vectorized": vectorized})
+    return runs
+
+
+def run_single(run):
+    """
+    Execute one run and collect its trace and summary statistics.
+    :param run: (dict) run configuration, as built by make_grid
+    :return: (dict) the run configuration with "trace" and "summary" added
+    """
+    random.seed(run["seed"])
+    trace = []
+    valences = []
+    lengths = []
+    happy_steps = 0
+    error = None
+    start = time.time()
+    try:
+        ex = create_existence(run["mechanism"], run["world"], run["primitive_interactions"], run.get("budget"),
+                              run.get("vectorized", False))
+        if run.get("memory") and run.get("shared"):
+            # the workers read the learned interactions from the same mapped pages, and each only keeps what it uses
+            share_memory(ex, run["memory"])
+        elif run.get("memory"):
+            # every worker loads its own copy of the learned interactions
+            load_memory(ex, run["memory"])
+        for i in range(0, run["steps"]):
+            trace.append(ex.step())
+            valences.append(ex.context_interaction.get_valence())
+            lengths.append(ex.context_interaction.get_length())
+            if ex.mood == 'HAPPY':
+                happy_steps += 1
+        memory_size = len(ex.memory)
+    except Exception as e:
+        error = "{0}: {1}".format(type(e).__name__, e)
+        memory_size = None
+    elapsed = time.time() - start
+
+    steps = len(trace)
+    summary = {"steps": steps,
+               "seconds": elapsed,
+               "steps_per_second": steps / elapsed if elapsed > 0 else None,
+               "mean_valence": float(sum(valences)) / steps if steps else None,
+               "happy_ratio": float(happy_steps) / steps if steps else None,
+               "mean_enacted_length": float(sum(lengths)) / steps if steps else None,
+               "memory_size": memory_size,
+               "error": error}
+    result = dict(run)
+    result["trace"] = trace
+    result["summary"] = summary
+    return result
+
+
+def run_batch(runs, processes=None):
+    """
+    Execute independent runs on a pool of worker processes.
+    :param runs: (list) of run configurations
+    :param processes: (int) number of worker processes; one per core if None
+    :return: (list) of results of run_single, in the order of runs
+    """
+    pool = multiprocessing.Pool(processes)
+    try:
+        # hand out runs one at a time so that long runs do not hold back a whole chunk
+        results = list(pool.imap(run_single, runs, chunksize=1))
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+if __name__ == '__main__':
+    # run with  python batch.py recursive,constructive test,real --seeds 10 --steps 500 -o sweep.json
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mechanisms", type=str, help="comma-separated learning mechanisms (simple, recursive, "
+                                                     "constructive)")
+    parser.add_argument("worlds", type=str, help="comma-separated worlds (test, real)")
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds per combination")
+    parser.add_argument("--steps", type=int, default=100, help="number of steps per run")
+    parser.add_argument("--valences", type=str, help="JSON file with a list of primitive interaction tables")
+    parser.add_argument("--memory", type=str, help="snapshot file to warm-start every run from")
+    parser.add_argument("--shared", action="store_true",
+                        help="map the --memory snapshot in every run instead of loading a copy of it")
+    parser.add_argument("--budget", type=int, help="number of composite interactions kept when memory is pruned "
+                                                   "(default: unbounded)")
+    parser.add_argument("--vectorized", action="store_true", help="sum up anticipations with NumPy")
+    parser.add_argument("-p", "--processes", type=int, help="number of worker processes (default: one per core)")
+    parser.add_argument("-o", "--output", type=str, help="file to write the results to (default: stdout)")
+    args = parser.parse_args()
+    if args.shared and args.budget is not None:
+        parser.error("--budget cannot be applied to a --shared memory")
+    if args.shared and args.vectorized:
+        parser.error("--vectorized cannot be applied to a --shared memory")
+
+    tables = (None,)
+    if args.valences:
+        with open(args.valences) as f:
+            tables = [dict((meaning, tuple(interaction)) for meaning, interaction in table.items())
+                      for table in json.load(f)]
+    grid = make_grid(args.mechanisms.split(","), args.worlds.split(","), range(0, args.seeds), args.steps, tables,
+                     args.memory, args.shared, args.budget, args.vectorized)
+    results = run_batch(grid, args.processes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+    else:
+        json.dump(results, sys.stdout)
@@ -0,0 +1,186 @@
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+from visualizer import canvas
+from environment import TestEnvironmentD1, TestEnvironmentD2, TestEnvironment, Environment, ConstructiveEnvironment, \
+    create_sequence_environment
+from architecture.existence import Existence, RecursiveExistence, ConstructiveExistence
+from architecture.memory import InteractionMemory
+from architecture.vectorized import VectorizedInteractionMemory
+from architecture.profiler import Profiler, clock
+from batch import TEST_PRIMITIVE_INTERACTIONS, REAL_PRIMITIVE_INTERACTIONS
+
+__author__ = 'katja'
+
+MECHANISMS = {"simple": Existence, "recursive": RecursiveExistence, "constructive": ConstructiveExistence}
+
+# mechanism -> worlds it can be driven in; simple and recursive existences consult the world with experiments,
+# the constructive existence with interactions; generated sequence worlds (see --depths) serve both
+WORLDS = {"simple": ["d1", "d2", "real"],
+          "recursive": ["d1", "d2", "real"],
+          "constructive": ["test", "real"]}
+
+SEQUENCE = "seq"  # prefix of the name of a sequence world, followed by its depth
+
+# configuration a benchmark is compared on, with the values assumed for results written before the key existed;
+# the alphabet only matters in sequence worlds
+RUN_KEYS = [("mechanism", None), ("world", None), ("vectorized", False), ("alphabet", 2), ("steps", None),
+            ("seed", None)]
+
+
+def create_environment(mechanism, world, alphabet=2, seed=None):
+    """
+    :param alphabet: (int) number of experiments of a sequence world
+    :param seed: random seed of the rules of a sequence world
+    """
+    if world.startswith(SEQUENCE):
+        return create_sequence_environment(int(world[len(SEQUENCE):]), alphabet, seed=seed)
+    elif world == "d1":
+        return TestEnvironmentD1()
+    elif world == "d2":
+        return TestEnvironmentD2()
+    elif world == "test":
+        return TestEnvironment()
+    elif world == "real":
+        start_location = (random.randint(canvas.BORDER, canvas.WIDTH-canvas.BORDER),
+                          random.randint(canvas.BORDER, canvas.HEIGHT-canvas.BORDER))
+        if mechanism == "constructive":
+            return ConstructiveEnvironment(canvas.Agent(start_location))
+        return Environment(canvas.Agent(start_location))
+    raise ValueError("unknown world {0}".format(world))
+
+
+def run_benchmark(config):
+    """
+    Drive one existence for a number of steps and measure it.
+    :param config: (dict) with mechanism, world, steps, sample (steps between memory samples), seed, vectorized and,
+    for sequence worlds, alphabet
+    :return: (dict) the configuration with the measurements added
+    """
+    random.seed(config["seed"])
+    environment = create_environment(config["mechanism"], config["world"], config.get("alphabet", 2), config["seed"])
+    if config["world"].startswith(SEQUENCE):
+        primitive_interactions = environment.get_primitive_interactions()
+    elif config["world"] == "real":
+        primitive_interactions = REAL_PRIMITIVE_INTERACTIONS
+    else:
+        primitive_interactions = TEST_PRIMITIVE_INTERACTIONS
+    memory = VectorizedInteractionMemory() if config.get("vectorized") else InteractionMemory()
+    ex = MECHANISMS[config["mechanism"]](primitive_interactions, environment, memory=memory)
+    profiler = Profiler(config["sample"])
+    profiler.attach(ex)
+
+    start = clock()
+    for i in range(0, config["steps"]):
+        ex.step()
+    seconds = clock() - start
+    profile = profiler.export()
+
+    result = dict(config)
+    result["seconds"] = seconds
+    result["steps_per_second"] = config["steps"] / seconds if seconds > 0 else None
+    result["phases"] = profile["phases"]
+    result["counters"] = profile["counters"]
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["memory_size"] = [[sample["step"], sample["memory_size"]] for sample in profile["samples"]]
+    result["samples"] = profile["samples"]
+    return result
+
+
+def run_suite(configs):
+    """
+    Run every benchmark in a fresh process, one after the other, so that peak memory and timings are not shared.
+    """
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        results = list(pool.imap(run_benchmark, configs, chunksize=1))
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def get_run_key(result):
+    sequence_world = result["world"].startswith(SEQUENCE)
+    return tuple(result.get(name, default) if name != "alphabet" or sequence_world else default
+                 for name, default in RUN_KEYS)
+
+
+def format_run_key(key):
+    return " ".join("{0}={1}".format(name, value) for (name, default), value in zip(RUN_KEYS, key))
+
+
+def compare(results, baseline, tolerance):
+    """
+    Report the change of steps per second against a previous run of the suite. Benchmarks are only compared with the
+    previous one of the same configuration (see RUN_KEYS); those of the baseline that were not run again are reported.
+    :return: (tuple) number of benchmarks compared, and list of run keys whose throughput dropped by more than tolerance
+    """
+    previous = dict((get_run_key(r), r) for r in baseline["results"])
+    regressions = []
+    compared = 0
+    for result in results:
+        key = get_run_key(result)
+        if key not in previous:
+            sys.stderr.write("{0}: no baseline\n".format(format_run_key(key)))
+            continue
+        baseline_result = previous.pop(key)
+        compared += 1
+        if not baseline_result["steps_per_second"]:
+            continue
+        ratio = result["steps_per_second"] / baseline_result["steps_per_second"]
+        sys.stderr.write("{0}: {1:10.1f} steps/s ({2:+.1%})\n".format(
+            format_run_key(key), result["steps_per_second"], ratio - 1))
+        if ratio < 1 - tolerance:
+            regressions.append(key)
+    for key in sorted(previous):
+        sys.stderr.write("{0}: in the baseline only\n".format(format_run_key(key)))
+    return compared, regressions
+
+
+if __name__ == '__main__':
+    # run with  python benchmark.py --steps 2000 -o bench.json, then compare later commits with --compare bench.json
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=1000, help="number of steps per benchmark")
+    parser.add_argument("--sample", type=int, default=100, help="steps between memory size samples")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of every benchmark")
+    parser.add_argument("-m", "--mechanisms", type=str, default="simple,recursive,constructive",
+                        help="comma-separated mechanisms to benchmark")
+    parser.add_argument("--vectorized", action="store_true", help="sum up anticipations with NumPy")
+    parser.add_argument("--depths", type=str, help="comma-separated depths of generated sequence worlds to "
+                                                   "benchmark as well, e.g. 1,2,4,8")
+    parser.add_argument("--alphabet", type=int, default=2, help="number of experiments of the sequence worlds")
+    parser.add_argument("-o", "--output", type=str, help="file to write the results to (default: stdout)")
+    parser.add_argument("--compare", type=str, help="results of a previous run to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative drop of steps per second reported as a regression")
+    args = parser.parse_args()
+
+    configs = []
+    sequence_worlds = [SEQUENCE + depth for depth in args.depths.split(",")] if args.depths else []
+    for mechanism in args.mechanisms.split(","):
+        for world in WORLDS[mechanism] + sequence_worlds:
+            config = {"mechanism": mechanism, "world": world, "steps": args.steps, "sample": args.sample,
+                      "seed": args.seed, "vectorized": args.vectorized}
+            if world.startswith(SEQUENCE):
+                config["alphabet"] = args.alphabet
+            configs.append(config)
+    report = {"python": sys.version.split()[0], "results": run_suite(configs)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compared, regressions = compare(report["results"], json.load(f), args.tolerance)
+        if not compared:
+            # a regression gate that compared nothing must not pass
+            sys.stderr.write("error: no benchmark matches the configuration of one in {0}\n".format(args.compare))
+            sys.exit(2)
+        if regressions:
+            sys.exit(1)
@@ -1,24 +1,124 @@
-import pygame
+import itertools
+import random
+
+
+class ActionTable:
+    """
+    What the experiments of a world do, declared once: experiment label -> handler -> result label.
+    The table also lists the primitive interactions each experiment can end in, so that the primitive interactions of
+    the agent are built from it, and the experiment of a primitive interaction and its handler are found with a single
+    lookup.
+    """
+    def __init__(self, actions):
+        """
+        :param actions: (list) of (experiment label, handler, interactions), where handler is a function of the
+        environment that performs the experiment and returns its result label, and interactions a list of
+        ((str) meaning, (str) result label, (int) valence) of the primitive interactions the experiment can end in
+        """
+        self.handlers = dict()  # experiment label -> handler
+        self.experiments = dict()  # primitive interaction label -> experiment label
+        self.interaction_handlers = dict()  # primitive interaction label -> (experiment label, handler)
+        self.primitive_interactions = dict()  # meaning -> (experiment label, result label, valence)
+        for experiment, handler, interactions in actions:
+            self.handlers[experiment] = handler
+            for meaning, result, valence in interactions:
+                self.experiments[experiment + result] = experiment
+                self.interaction_handlers[experiment + result] = (experiment, handler)
+                self.primitive_interactions[meaning] = (experiment, result, valence)
+
+    def get_handler(self, experiment):
+        """
+        :param experiment: (str) experiment label
+        :return: (function) handler of the experiment
+        """
+        return self.handlers[experiment]
+
+    def get_experiment(self, interaction):
+        """
+        :param interaction: (str) label of a primitive interaction
+        :return: (str) label of its experiment
+        """
+        return self.experiments[interaction]
+
+    def get_interaction_handler(self, interaction):
+        """
+        :param interaction: (str) label of a primitive interaction
+        :return: (tuple) label of its experiment and handler of the experiment
+        """
+        return self.interaction_handlers[interaction]
+
+    def get_primitive_interactions(self):
+        """
+        :return: (dict) primitive interactions of the world with their default valences, as existences take them
+        {(str) interaction meaning: ((str) experiment, (str) result, (int) valence)}
+        """
+        return dict(self.primitive_interactions)
+
+
+def move_forward(environment):
+    if environment.agent.move(1):
+        return 'r1'  # moved forward
+    return 'r2'  # bumped
+
+
+def turn_left(environment):
+    environment.agent.rotate(90)
+    return 'r3'
+
+
+def turn_right(environment):
+    environment.agent.rotate(-90)
+    return 'r4'
+
+
+def feel_front(environment):
+    if environment.agent.feel_front(1):
+        return 'r5'  # clear ahead
+    return 'r6'  # feel wall
+
+
+REAL_ACTIONS = ActionTable([("e1", move_forward, [("move forward", "r1", 2), ("bump", "r2", -50)]),
+                            ("e2", turn_left, [("turn left", "r3", -1)]),
+                            ("e3", turn_right, [("turn right", "r4", -1)]),
+                            ("e4", feel_front, [("touch empty", "r5", -1), ("touch wall", "r6", -2)])])
+
+
+# in the test world, an experiment succeeds (r2) when it is repeated right after the other experiment
+def repeat_e1(environment):
+    return 'r2' if environment.is_repeated('e1', 'e2') else 'r1'
+
+
+def repeat_e2(environment):
+    return 'r2' if environment.is_repeated('e2', 'e1') else 'r1'
+
+
+TEST_ACTIONS = ActionTable([("e1", repeat_e1, [("i1", "r1", -1), ("i2", "r2", 1)]),
+                            ("e2", repeat_e2, [("i3", "r1", -1), ("i4", "r2", 1)])])
 
 
 class Environment:
     """
     Class that implements the basic real-world environment.
+    The environment only updates the agent geometry; drawing is left to an optional renderer, without which the
+    environment runs headless.
     """
-    def __init__(self, agent, screen, clock):
+    def __init__(self, agent, renderer=None, actions=REAL_ACTIONS):
+        """
+        :param agent: (canvas.Agent) body of the agent in the world
+        :param renderer: (Renderer) notified after every primitive action, or None to run headless
+        :param actions: (ActionTable) what the experiments do
+        """
         self.agent = agent
-        self.screen = screen
-        self.clock = clock
+        self.renderer = renderer
+        self.actions = actions
         self.last_result = None
 
     def draw_agent(self):
         """
-        Draw the screen and the agent in it and display.
+        Let the renderer, if any, draw the agent.
         """
-        self.screen.fill((0, 0, 0))
-        pygame.draw.polygon(self.screen, self.agent.color, self.agent.vertices)
-        pygame.display.flip()
-        self.clock.tick(4)
+        if self.renderer is not None:
+            self.renderer.draw_agent(self.agent)
 
     def return_result(self, experiment):
         """
@@ -26,30 +126,8 @@ class Environment:
         :param experiment: (Experiment) experiment issued by the agent
         :return: (str) result
         """
-        result = None
-        if experiment.get_label() == 'e1':
-            if self.agent.move(1):
-                result = 'r1'  # moved forward
-                self.draw_agent()
-            else:
-                result = 'r2'  # bumped
-                self.draw_agent()
-        elif experiment.get_label() == 'e2':
-            self.agent.rotate(90)
-            result = 'r3'
-            self.draw_agent()
-        elif experiment.get_label() == 'e3':
-            self.agent.rotate(-90)
-            result = 'r4'
-            self.draw_agent()
-        elif experiment.get_label() == 'e4':
-            if self.agent.feel_front(1):
-                result = 'r5'  # clear ahead
-                self.draw_agent()
-            else:
-                result = 'r6'  # feel wall
-                self.draw_agent()
-
+        result = self.actions.get_handler(experiment.get_label())(self)
+        self.draw_agent()
         self.last_result = result
         return result
 
@@ -58,23 +136,23 @@ class ConstructiveEnvironment:
     """
     Class that implements constructive environment, in which interactions are the basic primitives.
     """
-    # TIMESTEP = 1
-    def __init__(self, agent, screen, clock, imgsaver):
+    def __init__(self, agent, renderer=None, actions=REAL_ACTIONS):
+        """
+        :param agent: (canvas.Agent) body of the agent in the world
+        :param renderer: (Renderer) notified after every primitive action, or None to run headless
+        :param actions: (ActionTable) what the experiments do
+        """
         self.agent = agent
-        self.screen = screen
-        self.clock = clock
+        self.renderer = renderer
+        self.actions = actions
         self.last_interaction = None
-        self.imgsaver = imgsaver
 
     def draw_agent(self):
-        self.screen.fill((0, 0, 0))
-        pygame.draw.polygon(self.screen, self.agent.color, self.agent.vertices)
-        pygame.display.flip()
-        self.clock.tick(10)
-        if self.imgsaver:
-            self.imgsaver.save_next_img(self.screen)
-        # pygame.image.save(self.screen, output_path + str(format(self.TIMESTEP, '03'))+".jpeg")
-        # self.TIMESTEP += 1
+        """
+        Let the renderer, if any, draw the agent.
+        """
+        if self.renderer is not None:
+            self.renderer.draw_agent(self.agent)
 
     def enact_primitive_interaction(self, intended_interaction):
         """
@@ -82,31 +160,9 @@ class ConstructiveEnvironment:
         :param intended_interaction: (Interaction) interaction attempted by the agent
         :return: (Interaction) interaction actually enacted
         """
-        experiment = intended_interaction.get_label()[:2]
-        result = None
-        if experiment == 'e1':
-            if self.agent.move(1):
-                result = 'r1'  # moved forward
-                self.draw_agent()
-            else:
-                result = 'r2'  # bumped
-                self.draw_agent()
-        elif experiment == 'e2':
-            self.agent.rotate(90)
-            result = 'r3'
-            self.draw_agent()
-        elif experiment == 'e3':
-            self.agent.rotate(-90)
-            result = 'r4'
-            self.draw_agent()
-        elif experiment == 'e4':
-            if self.agent.feel_front(1):
-                result = 'r5'  # clear ahead
-                self.draw_agent()
-            else:
-                result = 'r6'  # feel wall
-                self.draw_agent()
-
+        experiment, handler = self.actions.get_interaction_handler(intended_interaction.get_label())
+        result = handler(self)
+        self.draw_agent()
         enacted_interaction = experiment+result
         self.last_interaction = enacted_interaction
 
@@ -183,9 +239,13 @@ class TestEnvironment:
     Returns r2 when current experience equals previous and differs from penultimate.
     Returns R1 otherwise.
     """
-    def __init__(self):
+    def __init__(self, actions=TEST_ACTIONS):
+        """
+        :param actions: (ActionTable) what the experiments do
+        """
         self.penultimate_interaction = None
         self.previous_interaction = None
+        self.actions = actions
 
     def set_penultimate_interaction(self, penultimate_interaction):
         self.penultimate_interaction = penultimate_interaction
@@ -199,26 +259,144 @@ class TestEnvironment:
     def get_previous_interaction(self):
         return self.previous_interaction
 
-    def enact_primitive_interaction(self, intended_interaction):
+    def is_repeated(self, experiment, other_experiment):
+        """
+        :return: (bool) True if the previous interaction was of experiment and the penultimate of other_experiment
+        """
+        previous_interaction = self.get_previous_interaction()
         penultimate_interaction = self.get_penultimate_interaction()
-        # print "penultimate interaction", penultimate_interaction
+        if previous_interaction is None:
+            return False
+        if penultimate_interaction is None:
+            return True
+        return self.actions.get_experiment(penultimate_interaction) == other_experiment \
+            and self.actions.get_experiment(previous_interaction) == experiment
+
+    def enact_primitive_interaction(self, intended_interaction):
         previous_interaction = self.get_previous_interaction()
-        # print "previous interaction", previous_interaction
-
-        if "e1" in intended_interaction.get_label():
-            if previous_interaction is not None \
-                    and (penultimate_interaction is None or "e2" in penultimate_interaction and "e1" in previous_interaction):
-                enacted_interaction = "e1r2"
-            else:
-                enacted_interaction = "e1r1"
-        else:
-            if previous_interaction is not None \
-                    and (penultimate_interaction is None or "e1" in penultimate_interaction and "e2" in previous_interaction):
-                enacted_interaction = "e2r2"
-            else:
-                enacted_interaction = "e2r1"
+        experiment, handler = self.actions.get_interaction_handler(intended_interaction.get_label())
+        enacted_interaction = experiment + handler(self)
 
         self.set_penultimate_interaction(previous_interaction)
         self.set_previous_interaction(enacted_interaction)
 
         return enacted_interaction
+
+
+def make_sequence_handler(code):
+    """
+    :return: (function) handler of the experiment with the given code in a SequenceEnvironment
+    """
+    def handler(environment):
+        return environment.push_experiment(code)
+    return handler
+
+
+class SequenceEnvironment:
+    """
+    Command-line environment of any depth, whose results are given by patterns over the last experiments.
+    The last depth + 1 experiments, the current one included, are kept in a ring buffer, and also encoded as one number
+    that is updated as experiments come in. The result of every possible history is looked up in a table compiled
+    once from the patterns, so a step costs the same whatever the depth. The table has (number of experiments + 1) ^
+    (depth + 1) entries, which limits the depth of worlds with many experiments.
+    It can be consulted with experiments, like TestEnvironmentD2, or with interactions, like TestEnvironment.
+    """
+    def __init__(self, experiments, rules, default="r1", valences=None):
+        """
+        :param experiments: (list) of experiment labels
+        :param rules: (list) of (pattern, result label); a pattern is a tuple of the experiment labels of the history,
+        oldest first and ending with the current experiment, in which None matches any experiment or none yet. All
+        patterns have the same length, depth + 1. When several patterns match, the first one gives the result.
+        :param default: (str) result label when no pattern matches
+        :param valences: (dict) result label -> valence of the primitive interactions; 1 for r2 and -1 for any other
+        result if None
+        """
+        self.depth = len(rules[0][0]) - 1 if rules else 0
+        self.window = self.depth + 1
+        self.codes = dict((label, code) for code, label in enumerate(experiments, 1))  # 0 stands for no experiment
+        self.base = len(experiments) + 1
+        self.modulus = self.base ** self.window
+        self.table = self.compile_rules(rules, default)
+        self.code = 0  # history encoded in base self.base, the current experiment in the lowest digit
+        self.history = [None] * self.window  # ring buffer of the last experiment labels
+        self.position = 0  # where the next experiment goes in the ring buffer
+
+        results = [default] + [result for pattern, result in rules]
+        results = sorted(set(results))
+        if valences is None:
+            valences = dict((result, 1 if result == "r2" else -1) for result in results)
+        self.actions = ActionTable([(label, make_sequence_handler(code),
+                                     [(label + result, result, valences[result]) for result in results])
+                                    for label, code in sorted(self.codes.items(), key=lambda item: item[1])])
+
+    def compile_rules(self, rules, default):
+        """
+        :return: (list) result of every encoded history
+        """
+        table = [default] * self.modulus
+        # apply the first rules last, so that they take precedence
+        for pattern, result in reversed(rules):
+            if len(pattern) != self.window:
+                raise ValueError("pattern {0} is not of length {1}".format(pattern, self.window))
+            digits = [range(0, self.base) if label is None else [self.codes[label]] for label in pattern]
+            for history in itertools.product(*digits):
+                code = 0
+                for digit in history:
+                    code = code * self.base + digit
+                table[code] = result
+        return table
+
+    def push_experiment(self, code):
+        """
+        Add an experiment to the history.
+        :param code: (int) code of the experiment
+        :return: (str) result of the new history
+        """
+        self.code = (self.code * self.base + code) % self.modulus
+        return self.table[self.code]
+
+    def get_history(self):
+        """
+        :return: (list) of the last experiment labels, oldest first, None for those before the first experiment
+        """
+        return self.history[self.position:] + self.history[:self.position]
+
+    def record(self, label):
+        self.history[self.position] = label
+        self.position = (self.position + 1) % self.window
+
+    def return_result(self, experiment):
+        label = experiment.get_label()
+        result = self.actions.get_handler(label)(self)
+        self.record(label)
+        return result
+
+    def enact_primitive_interaction(self, intended_interaction):
+        experiment, handler = self.actions.get_interaction_handler(intended_interaction.get_label())
+        result = handler(self)
+        self.record(experiment)
+        return experiment + result
+
+    def get_primitive_interactions(self):
+        """
+        :return: (dict) primitive interactions an existence in this environment starts with
+        """
+        return self.actions.get_primitive_interactions()
+
+
+def create_sequence_environment(depth, size, rule_count=None, seed=None):
+    """
+    Generate a test environment of the given depth: r2 rewards experiments that complete one of a few random
+    sequences of depth + 1 experiments, r1 is the result of all others.
+    :param depth: (int) number of previous experiments the result depends on
+    :param size: (int) number of experiments
+    :param rule_count: (int) number of rewarded sequences; as many as experiments if None
+    :param seed: random seed of the sequences
+    :return: (SequenceEnvironment)
+    """
+    rng = random.Random(seed)
+    experiments = ["e{0}".format(i) for i in range(1, size + 1)]
+    if rule_count is None:
+        rule_count = size
+    rules = [(tuple(rng.choice(experiments) for i in range(0, depth + 1)), "r2") for i in range(0, rule_count)]
+    return SequenceEnvironment(experiments, rules)
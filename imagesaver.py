@@ -1,14 +1,142 @@
 import pygame
+import struct
+import threading
+import zlib
+from Queue import Queue
+
+__author__ = 'katja'
+
+FORMAT = 'RGB'
+
+# frame archive: MAGIC, then for every frame its width, height and compressed length, followed by the compressed pixels
+MAGIC = 'ENACTFRAMES1'
+FRAME_HEADER = struct.Struct('<HHI')
 
 
 class ImageSaver:
     """
     Class that implements image saving and output.
+    Frames are copied from the screen as raw buffers and encoded and written by a background thread, so that drawing
+    only waits for the writer when it falls more than a queue's length behind.
     """
-    def __init__(self, output_path):
+    def __init__(self, output_path, queue_size=64, frameskip=1):
+        """
+        :param output_path: (str) folder the images are written to
+        :param queue_size: (int) number of frames waiting to be written before save_next_img blocks
+        :param frameskip: (int) only every frameskip-th frame drawn is saved, at least 1
+        """
+        if frameskip < 1:
+            raise ValueError("frameskip must be at least 1, not {0}".format(frameskip))
         self.output_path = output_path
+        self.frameskip = frameskip
+        self.frames_drawn = 0
         self.TIMESTEP = 1
+        self.queue = Queue(queue_size)
+        self.error = None
+        self.writer = threading.Thread(target=self.write_frames)
+        self.writer.daemon = True
+        self.writer.start()
 
     def save_next_img(self, screen):
-        pygame.image.save(screen, self.output_path + str(format(self.TIMESTEP, '03'))+".jpeg")
-        self.TIMESTEP += 1
\ No newline at end of file
+        self.check_error()
+        self.frames_drawn += 1
+        if (self.frames_drawn - 1) % self.frameskip:
+            return
+        self.queue.put((self.TIMESTEP, pygame.image.tostring(screen, FORMAT), screen.get_size()))
+        self.TIMESTEP += 1
+
+    def write_frames(self):
+        """
+        Write the queued frames until close puts None in the queue.
+        """
+        while True:
+            frame = self.queue.get()
+            try:
+                if frame is None:
+                    return
+                if self.error is None:
+                    self.write_frame(*frame)
+            except Exception as e:
+                # keep emptying the queue, so that the drawing thread does not block; the error is raised there
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def write_frame(self, timestep, data, size):
+        """
+        Encode a frame as JPEG. Runs in the writer thread.
+        :param timestep: (int) number of the frame, from 1
+        :param data: (str) pixels of the frame, as given by pygame.image.tostring
+        :param size: (tuple) width and height of the frame
+        """
+        # six digits keep the files in order for the first million frames
+        path = self.output_path + str(format(timestep, '06'))+".jpeg"
+        pygame.image.save(pygame.image.fromstring(data, size, FORMAT), path)
+
+    def check_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def flush(self):
+        """
+        Wait until all the frames saved so far are written.
+        """
+        self.queue.join()
+        self.check_error()
+
+    def close(self):
+        """
+        Write the remaining frames and stop the writer.
+        """
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        self.check_error()
+
+
+class FrameRecorder(ImageSaver):
+    """
+    Image saver that streams the raw frames, compressed, into a single archive file instead of one image per frame.
+    Frames are appended one after the other, so writing is sequential; read_frames gives them back.
+    """
+    def __init__(self, path, queue_size=64, frameskip=1, level=1):
+        """
+        :param path: (str) archive file, overwritten if it exists
+        :param queue_size: (int) number of frames waiting to be written before save_next_img blocks
+        :param frameskip: (int) only every frameskip-th frame drawn is recorded
+        :param level: (int) zlib compression level; frames of the agent are mostly black, so the fastest level is enough
+        """
+        self.level = level
+        ImageSaver.__init__(self, path, queue_size, frameskip)
+        # frames are only queued once the archive is open, so the writer does not need it before
+        self.archive = open(path, 'wb')
+        self.archive.write(MAGIC)
+
+    def write_frame(self, timestep, data, size):
+        compressed = zlib.compress(data, self.level)
+        self.archive.write(FRAME_HEADER.pack(size[0], size[1], len(compressed)))
+        self.archive.write(compressed)
+
+    def close(self):
+        try:
+            ImageSaver.close(self)
+        finally:
+            self.archive.close()
+
+
+def read_frames(path):
+    """
+    Read back the frames of an archive written by FrameRecorder.
+    :param path: (str) archive file
+    :return: (generator) of (size, data) for every frame, data being the RGB pixels to give pygame.image.fromstring
+    """
+    with open(path, 'rb') as archive:
+        if archive.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{0} is not a frame archive".format(path))
+        while True:
+            header = archive.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            width, height, length = FRAME_HEADER.unpack(header)
+            yield (width, height), zlib.decompress(archive.read(length))
@@ -1,41 +1,79 @@
-import pygame
 import random
 from visualizer import canvas
-from environment import TestEnvironmentD1, TestEnvironmentD2, TestEnvironment, Environment, ConstructiveEnvironment
+from environment import TestEnvironmentD1, TestEnvironmentD2, TestEnvironment, Environment, ConstructiveEnvironment, \
+    TEST_ACTIONS, REAL_ACTIONS
 from architecture.existence import Existence, RecursiveExistence, ConstructiveExistence
+from architecture.memory import InteractionMemory
+from architecture.tracer import Tracer, LEVELS
+from architecture.snapshot import save_memory, load_memory
 import os
 import argparse
-from imagesaver import ImageSaver
 
 __author__ = 'katja'
 
 
-def main(mechanism, world, saveimg):
+def main(mechanism, world, saveimg, headless=False, steps=None, trace="debug", load=None, save=None, budget=None,
+         record=None, frameskip=1):
     """
     The main script that runs the simulation.
     :param mechanism: which mechanism will be used to simulate behavior (simple, recursive, constructive)
     :param world: which world will be used for simulation (command-line simple world, real world)
     :param saveimg: will the simulation output be saved
+    :param headless: run the real world without drawing it; needs steps, and images are neither saved nor recorded
+    :param steps: number of simulation steps, or None to run the real world until its window is closed
+    :param trace: how much of the agent's activity is printed (off, info, debug)
+    :param load: snapshot file of a learned memory the existence starts from
+    :param save: snapshot file the learned memory is saved to when the simulation ends
+    :param budget: number of composite interactions the existence keeps, or None to never forget
+    :param record: archive file the frames of the real world are recorded to, instead of saving them as images
+    :param frameskip: only every frameskip-th frame is saved or recorded
+    """
+    tracer = Tracer(LEVELS[trace])
+    try:
+        ex = run(mechanism, world, saveimg, headless, steps, tracer, load, budget, record, frameskip)
+    finally:
+        tracer.flush()
+    if save:
+        save_memory(ex, save)
+
+
+def run(mechanism, world, saveimg, headless, steps, tracer, load, budget, record=None, frameskip=1):
+    """
+    Set up the world and the existence and run the simulation; see main.
+    :return: (Existence) the existence after the simulation
     """
 
     # initialize existence
     ex = None
 
     if world == "real":
-        # initialize pygame environment
-        pygame.init()
-        clock = pygame.time.Clock()
-        screen = pygame.display.set_mode((canvas.WIDTH, canvas.HEIGHT))
-        done = False
-
-        # initialize output path
-        wd = os.getcwd()
-        output_path = '{0}/output/'.format(wd)
+        if headless and steps is None:
+            raise ValueError("a headless real world has no window to close, so it needs a number of steps")
+        renderer = None
         imgsaver = None
-        if saveimg:
-            # empty the output folder
-            map(os.unlink, [os.path.join(output_path, f) for f in os.listdir(output_path)])
-            imgsaver = ImageSaver(output_path)
+        done = False
+        if not headless:
+            # pygame is only needed to draw the world, so headless runs do without it
+            import pygame
+            from visualizer.renderer import Renderer
+            from imagesaver import ImageSaver, FrameRecorder
+
+            # initialize pygame environment
+            pygame.init()
+            clock = pygame.time.Clock()
+            screen = pygame.display.set_mode((canvas.WIDTH, canvas.HEIGHT))
+
+            # initialize output path
+            wd = os.getcwd()
+            output_path = '{0}/output/'.format(wd)
+            if record:
+                imgsaver = FrameRecorder(record, frameskip=frameskip)
+            elif saveimg:
+                # empty the output folder of the images of previous runs
+                if not os.path.isdir(output_path):
+                    os.makedirs(output_path)
+                map(os.unlink, [os.path.join(output_path, f) for f in os.listdir(output_path) if f.endswith(".jpeg")])
+                imgsaver = ImageSaver(output_path, frameskip=frameskip)
 
         # pick random start location
         start_location = (random.randint(canvas.BORDER,canvas.WIDTH-canvas.BORDER),
@@ -44,59 +82,78 @@ def main(mechanism, world, saveimg):
         kenny = canvas.Agent(start_location)
 
         # initialize primitive interactions
-        primitive_interactions = {"move forward": ("e1", "r1", 2), "bump": ("e1", "r2", -50),
-                                  "turn left": ("e2", "r3", -1), "turn right": ("e3", "r4", -1),
-                                  "touch empty": ("e4", "r5", -1), "touch wall": ("e4", "r6", -2)}
+        primitive_interactions = REAL_ACTIONS.get_primitive_interactions()
 
         # initialize environments and existences
         if mechanism == "simple":
-            environment = Environment(kenny, screen, clock)
-            ex = Existence(primitive_interactions, environment)
+            if not headless:
+                renderer = Renderer(screen, clock, 4, imgsaver)
+            environment = Environment(kenny, renderer)
+            ex = Existence(primitive_interactions, environment, tracer, InteractionMemory(budget))
         elif mechanism == "recursive":
-            environment = Environment(kenny, screen, clock)
-            ex = RecursiveExistence(primitive_interactions, environment)
+            if not headless:
+                renderer = Renderer(screen, clock, 4, imgsaver)
+            environment = Environment(kenny, renderer)
+            ex = RecursiveExistence(primitive_interactions, environment, tracer, InteractionMemory(budget))
         elif mechanism == "constructive":
-            environment = ConstructiveEnvironment(kenny, screen, clock, imgsaver)
-            ex = ConstructiveExistence(primitive_interactions, environment)
-
-        i = 1
-        while not done:
-            # screen.fill((0, 0, 0))
-            # quit if close button is pressed
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+            if not headless:
+                renderer = Renderer(screen, clock, 10, imgsaver)
+            environment = ConstructiveEnvironment(kenny, renderer)
+            ex = ConstructiveExistence(primitive_interactions, environment, tracer, InteractionMemory(budget))
+
+        if load:
+            load_memory(ex, load)
+
+        try:
+            i = 1
+            while not done:
+                # screen.fill((0, 0, 0))
+                # quit if close button is pressed
+                if not headless:
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            done = True
+
+                # perform one simulation step (that might consist of several primitive steps)
+                step_trace = ex.step()
+                tracer.info("%s\n", (i, step_trace))
+                i += 1
+                if steps is not None and i > steps:
                     done = True
 
-            # perform one simulation step (that might consist of several primitive steps)
-            step_trace = ex.step()
-            print (i, step_trace)
-            print "\n"
-            i += 1
-
-            # pygame.draw.polygon(screen, kenny.color, kenny.vertices)
-            # if saveimg:
-            #     # save each frame as image
-            #     pygame.image.save(screen, output_path + str(format(i, '03'))+".jpeg")
-            # pygame.display.flip()
-            # clock.tick(3)
+                # pygame.draw.polygon(screen, kenny.color, kenny.vertices)
+                # if saveimg:
+                #     # save each frame as image
+                #     pygame.image.save(screen, output_path + str(format(i, '03'))+".jpeg")
+                # pygame.display.flip()
+                # clock.tick(3)
+        finally:
+            if imgsaver:
+                # wait for the frames still being written
+                imgsaver.close()
 
     elif world == "test":
-        primitive_interactions = {"i1": ("e1", "r1", -1), "i2": ("e1", "r2", 1),
-                                  "i3": ("e2", "r1", -1), "i4": ("e2", "r2", 1)}
+        primitive_interactions = TEST_ACTIONS.get_primitive_interactions()
         if mechanism == "simple":
             environment = TestEnvironmentD1()
-            ex = Existence(primitive_interactions, environment)
+            ex = Existence(primitive_interactions, environment, tracer, InteractionMemory(budget))
         elif mechanism == "recursive":
             environment = TestEnvironmentD2()
-            ex = RecursiveExistence(primitive_interactions, environment)
+            ex = RecursiveExistence(primitive_interactions, environment, tracer, InteractionMemory(budget))
         elif mechanism == "constructive":
             environment = TestEnvironment()
-            ex = ConstructiveExistence(primitive_interactions, environment)
+            ex = ConstructiveExistence(primitive_interactions, environment, tracer, InteractionMemory(budget))
 
-        for i in range(0, 15):
+        if load:
+            load_memory(ex, load)
+
+        if steps is None:
+            steps = 15
+        for i in range(0, steps):
             step_trace = ex.step()
-            print (i, step_trace)
-            print "\n"
+            tracer.info("%s\n", (i, step_trace))
+
+    return ex
 
 
 if __name__ == '__main__':
@@ -108,6 +165,26 @@ if __name__ == '__main__':
                         choices=["test", "real"])
     parser.add_argument("-s", "--saveimg", help="when specified, simulation is saved as images in output folder",
                         action="store_true")
+    parser.add_argument("--record", type=str, help="record the real world to a single compressed frame archive "
+                                                   "instead of saving images")
+    parser.add_argument("--frameskip", type=int, default=1, help="only save or record every n-th frame (n >= 1)")
+    parser.add_argument("--headless", help="run the real world without drawing it (needs --steps)",
+                        action="store_true")
+    parser.add_argument("-n", "--steps", type=int, help="number of simulation steps (real world runs until closed "
+                                                         "by default, test world runs 15 steps)")
+    parser.add_argument("-t", "--trace", type=str, help="how much of the agent's activity is printed",
+                        choices=["off", "info", "debug"], default="debug")
+    parser.add_argument("--load", type=str, help="start from the memory saved in a snapshot file")
+    parser.add_argument("--save", type=str, help="save the learned memory to a snapshot file at the end")
+    parser.add_argument("--budget", type=int, help="number of composite interactions kept when memory is pruned "
+                                                   "(default: unbounded)")
     args = parser.parse_args()
-    main(args.mechanism, args.world, args.saveimg)
+    if args.headless and args.world == "real" and args.steps is None:
+        parser.error("a --headless real world has no window to close, so it needs --steps")
+    if args.headless and (args.saveimg or args.record):
+        parser.error("nothing is drawn with --headless, so there are no images to save or record")
+    if args.frameskip < 1:
+        parser.error("--frameskip must be at least 1")
+    main(args.mechanism, args.world, args.saveimg, args.headless, args.steps, args.trace, args.load, args.save,
+         args.budget, args.record, args.frameskip)
 
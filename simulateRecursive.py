@@ -48,8 +48,8 @@ def main(saveimg):
         intended_interaction.set_experiment(experiment)
         enacted_interaction = ex.enact(intended_interaction)
 
-        if enacted_interaction != intended_interaction and experiment.is_abstract:
-            failed_result = ex.addget_result(enacted_interaction.get_label().upper())
+        if enacted_interaction != intended_interaction and experiment.is_abstract():
+            failed_result = ex.addget_failed_result(enacted_interaction)
             valence = enacted_interaction.get_valence()
             enacted_interaction = ex.addget_primitive_interaction(experiment, failed_result, valence)
 
@@ -0,0 +1,69 @@
+import random
+import unittest
+from batch import create_existence
+from architecture.existence import RecursiveExistence
+from architecture.memory import get_dependencies
+
+__author__ = 'katja'
+
+# the simple existence only learns a couple of composites in the test world, which never fill a budget
+WORLDS = [("simple", "real"), ("recursive", "test"), ("recursive", "real"), ("constructive", "test"),
+          ("constructive", "real")]
+
+
+class PruningTest(unittest.TestCase):
+    """
+    A memory kept within a budget must stay consistent: whatever an interaction refers to is still in memory, and the
+    indexes only hold interactions in memory.
+    """
+    def is_live(self, memory, interaction):
+        interaction_id = interaction.get_id()
+        return interaction_id is not None and interaction_id < len(memory.interactions) \
+            and memory.interactions[interaction_id] is interaction
+
+    def check_memory(self, existence):
+        memory = existence.memory
+        interactions = list(memory)
+        self.assertEqual(len(interactions), len(memory))
+        activations = dict()
+        for interaction in interactions:
+            for dependency in get_dependencies(interaction):
+                self.assertTrue(self.is_live(memory, dependency))
+            for composite in interaction.get_composite_interactions():
+                self.assertTrue(self.is_live(memory, composite))
+            for alternative in interaction.get_alternative_interactions():
+                self.assertTrue(self.is_live(memory, alternative))
+            if not interaction.is_primitive():
+                key = (interaction.get_pre_interaction().get_id(), interaction.get_post_interaction().get_id())
+                self.assertEqual(memory.composite_ids[key], interaction.get_id())
+                activations.setdefault(key[0], set()).add(interaction.get_id())
+        self.assertEqual(len(memory.composite_ids), sum(len(ids) for ids in activations.values()))
+        self.assertEqual(dict((pre_id, set(composite.get_id() for composite in composites))
+                              for pre_id, composites in memory.activations.items()), activations)
+        for interaction_id in memory.primitive_ids.values():
+            self.assertTrue(memory.interactions[interaction_id].is_primitive())
+        if isinstance(existence, RecursiveExistence):
+            for interaction_id, failed_result in existence.failed_results.items():
+                self.assertTrue(self.is_live(memory, failed_result.enacted_interaction))
+                self.assertEqual(failed_result.enacted_interaction.get_id(), interaction_id)
+            for context_interaction in (existence.context_interaction, existence.context_pair_interaction):
+                self.assertTrue(context_interaction is None or self.is_live(memory, context_interaction))
+
+    def test_budget(self):
+        budget = 20
+        for mechanism, world in WORLDS:
+            random.seed(3)
+            existence = create_existence(mechanism, world, budget=budget)
+            forgotten = False
+            for step in range(0, 500):
+                existence.step()
+                if step % 25 == 0:
+                    self.check_memory(existence)
+                self.assertLessEqual(len(existence.memory.composite_ids), budget)
+                forgotten = forgotten or bool(existence.memory.free_ids)
+            self.check_memory(existence)
+            self.assertTrue(forgotten, mechanism + " " + world)
+
+
+if __name__ == '__main__':
+    unittest.main()
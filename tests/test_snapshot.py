@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from batch import create_existence, TEST_PRIMITIVE_INTERACTIONS
+from architecture.snapshot import save_memory, load_memory
+from architecture.shared import share_memory
+
+__author__ = 'katja'
+
+WORLDS = [("simple", "test"), ("simple", "real"), ("recursive", "test"), ("recursive", "real"),
+          ("constructive", "test"), ("constructive", "real")]
+
+
+def describe(existence):
+    """
+    :return: (list) everything a snapshot keeps of the interactions of an existence, in ID order
+    """
+    return [(interaction.get_id(), interaction.get_label(), interaction.get_weight(), interaction.get_valence(),
+             interaction.get_meaning(),
+             interaction.get_experiment() is not None and interaction.get_experiment().get_label() or None,
+             sorted(alternative.get_id() for alternative in interaction.get_alternative_interactions()),
+             sorted(composite.get_id() for composite in existence.memory.get_activated_interactions(interaction)))
+            for interaction in existence.memory]
+
+
+def run(mechanism, world, steps, seed, primitive_interactions=None, budget=None):
+    random.seed(seed)
+    existence = create_existence(mechanism, world, primitive_interactions, budget)
+    for i in range(0, steps):
+        existence.step()
+    return existence
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "memory.snap")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        for mechanism, world in WORLDS:
+            existence = run(mechanism, world, 300, 3)
+            save_memory(existence, self.path)
+            loaded = create_existence(mechanism, world)
+            load_memory(loaded, self.path)
+            self.assertEqual(describe(existence), describe(loaded), mechanism + " " + world)
+
+    def test_round_trip_after_pruning(self):
+        # pruned memories reuse the IDs of forgotten interactions, so interactions are no longer in ID order
+        for mechanism, world in WORLDS:
+            existence = run(mechanism, world, 400, 3, budget=20)
+            save_memory(existence, self.path)
+            loaded = create_existence(mechanism, world)
+            load_memory(loaded, self.path)
+            self.assertEqual(sorted(interaction.get_label() for interaction in existence.memory),
+                             sorted(interaction.get_label() for interaction in loaded.memory), mechanism + " " + world)
+
+    def test_unicode_meanings(self):
+        primitive_interactions = dict((u"%s é→" % meaning, interaction)
+                                      for meaning, interaction in TEST_PRIMITIVE_INTERACTIONS.items())
+        for mechanism in ("simple", "recursive", "constructive"):
+            existence = run(mechanism, "test", 200, 1, primitive_interactions)
+            save_memory(existence, self.path)
+            loaded = create_existence(mechanism, "test", primitive_interactions)
+            load_memory(loaded, self.path)
+            self.assertEqual(describe(existence), describe(loaded), mechanism)
+
+    def test_missing_valence(self):
+        existence = create_existence("recursive", "test")
+        existence.addget_primitive_interaction(existence.experiments["e1"], existence.addget_result("r9"))
+        save_memory(existence, self.path)
+        loaded = create_existence("recursive", "test")
+        load_memory(loaded, self.path)
+        self.assertIsNone(loaded.memory.get_primitive((loaded.experiments["e1"], loaded.results["r9"])).get_valence())
+
+    def test_shared_memory(self):
+        # an agent on a shared snapshot behaves as one that loaded it, and only keeps what it learns in its overlay
+        for mechanism, world in WORLDS:
+            save_memory(run(mechanism, world, 300, 3), self.path)
+            results = []
+            for share in (False, True):
+                random.seed(5)
+                existence = create_existence(mechanism, world)
+                (share_memory if share else load_memory)(existence, self.path)
+                trace = [existence.step() for i in range(0, 200)]
+                results.append((trace, describe(existence)))
+            self.assertEqual(results[0], results[1], mechanism + " " + world)
+            # the memory of a shared agent saves like any other
+            save_memory(existence, self.path)
+            loaded = create_existence(mechanism, world)
+            load_memory(loaded, self.path)
+            self.assertEqual(describe(existence), describe(loaded), mechanism + " " + world)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import random
+import unittest
+from batch import create_existence
+from architecture.vectorized import numpy
+
+__author__ = 'katja'
+
+WORLDS = [("simple", "test"), ("simple", "real"), ("recursive", "test"), ("recursive", "real"),
+          ("constructive", "test"), ("constructive", "real")]
+
+
+@unittest.skipIf(numpy is None, "the vectorized memory needs NumPy")
+class VectorizedMemoryTest(unittest.TestCase):
+    """
+    The NumPy memory sums up the same anticipations as the pure Python one, so an agent behaves the same with either.
+    """
+    def run_traces(self, mechanism, world, vectorized, budget=None):
+        random.seed(11)
+        existence = create_existence(mechanism, world, budget=budget, vectorized=vectorized)
+        return [existence.step() for i in range(0, 400)]
+
+    def test_same_traces(self):
+        for mechanism, world in WORLDS:
+            self.assertEqual(self.run_traces(mechanism, world, False), self.run_traces(mechanism, world, True),
+                             mechanism + " " + world)
+
+    def test_same_traces_with_budget(self):
+        # forgotten interactions give their IDs to new ones, whose weights replace theirs in the array
+        for mechanism, world in WORLDS:
+            self.assertEqual(self.run_traces(mechanism, world, False, 20),
+                             self.run_traces(mechanism, world, True, 20), mechanism + " " + world)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,4 @@
 import math
-from copy import deepcopy
 
 UNIT = 10
 BORDER = UNIT*2
@@ -9,82 +8,84 @@ BLUE = (0, 128, 255)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 
+# heading in degrees -> (cosine, sine), exact for the headings the agent turns between
+DIRECTIONS = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}
 
-class Agent:
+
+def get_direction(angle):
+    """Returns the cosine and sine of an angle in degrees."""
+    direction = DIRECTIONS.get(angle % 360)
+    if direction is None:
+        a = math.radians(angle)
+        direction = (math.cos(a), math.sin(a))
+    return direction
+
+
+def is_inside(x, y):
+    """Returns True if a center is far enough from the edges for all the vertices to be inside the field."""
+    return BORDER <= x <= WIDTH-BORDER and BORDER <= y <= HEIGHT-BORDER
+
+
+class Agent(object):
     """
     Class that implements agent and environment visualization.
+    Actions only work on the center and the heading; the vertices are computed when the agent is drawn.
     """
     def __init__(self, center):
         self.center = center
         self.angle = 90
-        self.get_vertices()
         self.color = BLUE
 
+    @property
+    def vertices(self):
+        return self.get_vertices()
+
     def get_vertices(self):
         """center is an x,y-tuple; angle is a float"""
         a = self.rotate_point((self.center[0]-1*UNIT, self.center[1]-1*UNIT))
         b = self.rotate_point((self.center[0]-1*UNIT, self.center[1]+1*UNIT))
         c = self.rotate_point((self.center[0]+2*UNIT, self.center[1]))  # triangle head
-        self.vertices = [a,b,c]
+        return [a, b, c]
 
     def rotate_point(self, point):
         """Rotates a point around another center point. Angle is in degrees.
         Rotation is counter-clockwise."""
-        a = math.radians(self.angle)
+        cosine, sine = get_direction(self.angle)
         temp_point = point[0]-self.center[0], point[1]-self.center[1]
-        temp_point = (temp_point[0]*math.cos(a)-temp_point[1]*math.sin(a), temp_point[0]*math.sin(a)+temp_point[1]*math.cos(a))
-        temp_point = temp_point[0]+self.center[0] , temp_point[1]+self.center[1]
+        temp_point = (temp_point[0]*cosine-temp_point[1]*sine, temp_point[0]*sine+temp_point[1]*cosine)
+        temp_point = temp_point[0]+self.center[0], temp_point[1]+self.center[1]
         return temp_point
 
+    def get_ahead(self, steps):
+        """Returns the center the agent would have after moving by a number of steps."""
+        cosine, sine = get_direction(self.angle)
+        return self.center[0]+steps*UNIT*cosine, self.center[1]+steps*UNIT*sine
+
     def move(self, steps):
         """Displaces the agent by a number of steps."""
-        self.color = BLUE
-        a = math.radians(self.angle)
-        sine = math.sin(a)
-        cosine = math.cos(a)
-        old_vertices = deepcopy(self.vertices)
-        old_center = deepcopy(self.center)
-        self.center = (self.center[0]+steps*UNIT*cosine, self.center[1]+steps*UNIT*sine)
-        self.get_vertices()
-        if not self.check_inside():
-            self.vertices = old_vertices
-            self.center = old_center
+        center = self.get_ahead(steps)
+        if not is_inside(*center):
             self.color = RED
             return False
+        self.center = center
+        self.color = BLUE
         return True
 
     def rotate(self, angle):
         """Rotates the agent in place by some angle."""
         self.color = BLUE
-        self.angle += angle
-        old_vertices = deepcopy(self.vertices)
-        self.get_vertices()
-        if not self.check_inside():
-            self.vertices = old_vertices
-            self.angle -= angle
+        # turning does not move the center
+        if self.check_inside():
+            self.angle += angle
 
     def feel_front(self, steps):
         """Checks whether there is an obstacle ahead. Returns True if not."""
         self.color = GREEN
-        a = math.radians(self.angle)
-        sine = math.sin(a)
-        cosine = math.cos(a)
-        old_vertices = deepcopy(self.vertices)
-        old_center = deepcopy(self.center)
-        self.center = (self.center[0]+steps*UNIT*cosine, self.center[1]+steps*UNIT*sine)
-        self.get_vertices()
-        clear_ahead = self.check_inside()
-        self.vertices = old_vertices
-        self.center = old_center
-        return clear_ahead
+        return is_inside(*self.get_ahead(steps))
 
     def check_inside(self):
         """Returns True if all the vertices are inside the field."""
-        if self.center[0]-BORDER < 0 or self.center[0]+BORDER > WIDTH:
-            return False
-        if self.center[1]-BORDER < 0 or self.center[1]+BORDER > HEIGHT:
-            return False
-        return True
+        return is_inside(*self.center)
 
     # def feel(self):
-    #     return None
\ No newline at end of file
+    #     return None
@@ -0,0 +1,32 @@
+import pygame
+
+__author__ = 'katja'
+
+
+class Renderer:
+    """
+    Class that draws the agent on the pygame screen. Environments notify their renderer after every primitive action;
+    without one they run headless and are limited only by the speed of the agent.
+    """
+    def __init__(self, screen, clock, fps, imgsaver=None):
+        """
+        :param screen: (pygame.Surface) display surface
+        :param clock: (pygame.time.Clock) clock used to cap the frame rate
+        :param fps: (int) maximum number of frames drawn per second
+        :param imgsaver: (ImageSaver) if given, every frame is also saved
+        """
+        self.screen = screen
+        self.clock = clock
+        self.fps = fps
+        self.imgsaver = imgsaver
+
+    def draw_agent(self, agent):
+        """
+        Draw the screen and the agent in it and display.
+        """
+        self.screen.fill((0, 0, 0))
+        pygame.draw.polygon(self.screen, agent.color, agent.vertices)
+        pygame.display.flip()
+        self.clock.tick(self.fps)
+        if self.imgsaver:
+            self.imgsaver.save_next_img(self.screen)
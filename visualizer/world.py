@@ -0,0 +1,160 @@
+"""
+Real world shared by many agents, whose positions and headings are kept in NumPy arrays.
+
+Agents have the geometry of canvas.Agent: a center that must stay BORDER away from the edges of the field, and a heading
+that is a multiple of 90 degrees, counter-clockwise from the x axis. Headings are kept as an index into the table of exact
+directions of canvas, so an agent of the world ends up exactly where a canvas.Agent would. Agents do not collide with
+each other.
+World.step resolves one experiment for every agent at once and returns the results Environment.return_result gives for
+the same experiments (r1 moved forward, r2 bumped, r3 turned left, r4 turned right, r5 clear ahead, r6 felt a wall).
+World.get_agent gives a view of one agent with the interface of canvas.Agent, so that an Environment and a Renderer can be
+driven by an agent of the world.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from canvas import UNIT, BORDER, WIDTH, HEIGHT, BLUE, RED, GREEN, DIRECTIONS, is_inside
+
+__author__ = 'katja'
+
+# experiments
+MOVE = 0
+TURN_LEFT = 1
+TURN_RIGHT = 2
+FEEL = 3
+NONE = 4  # the agent does nothing this step
+
+EXPERIMENT_CODES = {"e1": MOVE, "e2": TURN_LEFT, "e3": TURN_RIGHT, "e4": FEEL, None: NONE}
+
+# experiment -> (result if the square ahead is outside the field, result if it is inside)
+RESULTS = [("r2", "r1"), ("r3", "r3"), ("r4", "r4"), ("r6", "r5"), (None, None)]
+
+# experiment -> change of heading index
+TURNS = [0, 1, -1, 0, 0]
+
+# heading index -> direction; heading h is an angle of 90 * h degrees
+HEADINGS = [DIRECTIONS[90 * heading] for heading in range(0, 4)]
+
+
+class World(object):
+    """
+    A field with many agents, stepped together.
+    """
+    def __init__(self, centers, angles=None):
+        """
+        :param centers: (list) of (x, y) start locations, one per agent
+        :param angles: (list) of start headings in degrees, multiples of 90; all agents head at 90 degrees if None, as
+        canvas.Agent does
+        """
+        if numpy is None:
+            raise ImportError("the multi-agent world needs NumPy")
+        self.centers = numpy.array(centers, dtype=numpy.float64).reshape(-1, 2)
+        if angles is None:
+            angles = [90] * len(self.centers)
+        if any(angle % 90 for angle in angles):
+            raise ValueError("headings must be multiples of 90 degrees")
+        self.headings = numpy.array([angle // 90 for angle in angles], dtype=numpy.intp) % 4
+        self.directions = numpy.array(HEADINGS, dtype=numpy.float64)
+        self.turns = numpy.array(TURNS, dtype=numpy.intp)
+        self.results = numpy.array(RESULTS, dtype=object)
+
+    def __len__(self):
+        return len(self.centers)
+
+    def step(self, experiments):
+        """
+        Let every agent try an experiment.
+        :param experiments: (list) experiment label of each agent (e1 move forward, e2 turn left, e3 turn right,
+        e4 feel front), or None for an agent that does nothing
+        :return: (list) result label of each agent, None for those that did nothing
+        """
+        return self.step_codes(numpy.array([EXPERIMENT_CODES[label] for label in experiments], dtype=numpy.intp))
+
+    def step_codes(self, codes):
+        """
+        Same as step, with experiments given as an array of codes (MOVE, TURN_LEFT, TURN_RIGHT, FEEL or NONE).
+        """
+        ahead = self.centers + UNIT * self.directions[self.headings]
+        clear = self.is_inside(ahead)
+        moving = (codes == MOVE) & clear
+        self.centers[moving] = ahead[moving]
+        # turning does not move the center, so it only fails for an agent already outside the field
+        self.headings += self.turns[codes] * self.is_inside(self.centers)
+        self.headings %= 4
+        return self.results[codes, clear.astype(numpy.intp)].tolist()
+
+    @staticmethod
+    def is_inside(centers):
+        """
+        :return: (numpy.ndarray) True where a center is far enough from the edges of the field (see canvas.is_inside)
+        """
+        x = centers[:, 0]
+        y = centers[:, 1]
+        return (x >= BORDER) & (x <= WIDTH-BORDER) & (y >= BORDER) & (y <= HEIGHT-BORDER)
+
+    def get_agent(self, index):
+        """
+        :return: (WorldAgent) view of one agent
+        """
+        return WorldAgent(self, index)
+
+
+class WorldAgent(object):
+    """
+    One agent of a World, with the interface of canvas.Agent. Its actions are resolved one at a time.
+    """
+    def __init__(self, world, index):
+        self.world = world
+        self.index = index
+        self.color = BLUE
+
+    @property
+    def center(self):
+        return tuple(self.world.centers[self.index].tolist())
+
+    @property
+    def angle(self):
+        return 90 * int(self.world.headings[self.index])
+
+    @property
+    def vertices(self):
+        """Triangle pointing along the heading, computed only when the agent is drawn."""
+        x, y = self.center
+        cosine, sine = HEADINGS[self.world.headings[self.index]]
+        # points of canvas.Agent.get_vertices, rotated around the center
+        return [(x - UNIT * cosine + UNIT * sine, y - UNIT * sine - UNIT * cosine),
+                (x - UNIT * cosine - UNIT * sine, y - UNIT * sine + UNIT * cosine),
+                (x + 2 * UNIT * cosine, y + 2 * UNIT * sine)]
+
+    def get_ahead(self, steps):
+        cosine, sine = HEADINGS[self.world.headings[self.index]]
+        x, y = self.center
+        return x + steps * UNIT * cosine, y + steps * UNIT * sine
+
+    def move(self, steps):
+        """Displaces the agent by a number of steps. Returns False if it would leave the field."""
+        x, y = self.get_ahead(steps)
+        if not is_inside(x, y):
+            self.color = RED
+            return False
+        self.world.centers[self.index] = (x, y)
+        self.color = BLUE
+        return True
+
+    def rotate(self, angle):
+        """Rotates the agent in place by a multiple of 90 degrees."""
+        if angle % 90:
+            raise ValueError("agents of the world only turn by multiples of 90 degrees")
+        self.color = BLUE
+        if self.check_inside():
+            self.world.headings[self.index] = (self.world.headings[self.index] + angle // 90) % 4
+
+    def feel_front(self, steps):
+        """Checks whether there is an obstacle ahead. Returns True if not."""
+        self.color = GREEN
+        return is_inside(*self.get_ahead(steps))
+
+    def check_inside(self):
+        return is_inside(*self.center)